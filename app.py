@@ -1,16 +1,103 @@
 # app.py
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, g, before_render_template, template_rendered
 from utils.config_manager import load_config, save_config, get_available_funds
-from utils.allocation import get_allocations
-from utils.rebalancing import calculate_rebalancing
+from utils.allocation import get_glide_path
+from utils.rebalancing import calculate_rebalancing, calculate_rebalancing_batch, calculate_share_rebalancing, parse_bulk_holdings
+from utils.refresher import REFRESH_INTERVAL, build_snapshot, get_snapshot, store_snapshot, start_refresh_worker, request_refresh
+from utils.price_cache import DEFAULT_MAX_BYTES, configure_price_cache, dates_to_days
+from utils.export import EXPORT_FORMATS, HISTORY_COLUMNS, history_batches, performance_table, allocation_table, stream_csv, write_parquet
+from utils.metrics import observe, record_phase, timer, start_request, finish_request, server_timing_header, render_prometheus
+import cProfile
 import datetime
-import yfinance as yf
-import pandas as pd
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+# The pandas/yfinance-backed modules (utils.fetcher, utils.performance, utils.downsampling,
+# utils.backtest, utils.projection) are imported inside the routes that need them so the app
+# starts, and gunicorn workers fork, without loading them.
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # Replace with a secure secret key
 
+MAX_PROJECTION_PATHS = 200000
+# Where ?profile=1 writes cProfile dumps when the app runs in debug mode
+PROFILE_DIR = os.path.join('data', 'profiles')
+# Seconds between background price refreshes, 0 keeps all fetching on the request path
+app.config.setdefault('PRICE_REFRESH_INTERVAL', REFRESH_INTERVAL)
+# Memory budget of the in-process price cache, and an optional directory whose memory-mapped
+# files let every worker process share one copy of the price series
+app.config.setdefault('PRICE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+app.config.setdefault('PRICE_CACHE_MMAP_DIR', None)
+# ASGI scope key under which asgi.py passes (seconds, {symbol: result or Exception}) of its prefetch
+PREFETCH_SCOPE_KEY = 'fund_manager.prefetch'
+
+@app.before_request
+def ensure_refresh_worker():
+    if app.config['PRICE_REFRESH_INTERVAL']:
+        start_refresh_worker(app.config['PRICE_REFRESH_INTERVAL'])
+
+@app.before_request
+def ensure_price_cache():
+    configure_price_cache(app.config['PRICE_CACHE_MAX_BYTES'], app.config['PRICE_CACHE_MMAP_DIR'])
+
+@app.before_request
+def start_request_timing():
+    start_request()
+    g.request_started = time.perf_counter()
+    g.profiler = None
+    if app.debug and request.args.get('profile'):
+        g.profiler = cProfile.Profile()
+        try:
+            g.profiler.enable()
+        except ValueError:
+            g.profiler = None  # Another request on this process is already being profiled
+
+@app.before_request
+def use_prefetched_prices():
+    # Only set under asgi.py; recorded here because request phases belong to the view's thread
+    prefetch = request.environ.get('asgi.scope', {}).get(PREFETCH_SCOPE_KEY)
+    if prefetch is not None:
+        from utils.fetcher import set_prefetched
+        seconds, results = prefetch
+        record_phase('prefetch', seconds)
+        set_prefetched(results)
+        g.prefetched = True
+
+@app.teardown_request
+def clear_prefetched_prices(exc):
+    if g.pop('prefetched', False):
+        from utils.fetcher import set_prefetched
+        set_prefetched(None)
+
+@app.after_request
+def finish_request_timing(response):
+    total = time.perf_counter() - g.pop('request_started', time.perf_counter())
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_path = os.path.join(PROFILE_DIR, f"{request.endpoint or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler.dump_stats(profile_path)
+        response.headers['X-Profile-Path'] = profile_path
+    observe('request_seconds', total, {'endpoint': request.endpoint or 'unknown', 'method': request.method,
+                                       'status': str(response.status_code)})
+    response.headers['Server-Timing'] = server_timing_header(finish_request(), total)
+    return response
+
+@before_render_template.connect_via(app)
+def start_render_timing(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def finish_render_timing(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    if started is not None:
+        record_phase('render', time.perf_counter() - started, {'template': template.name or 'unknown'})
+
 @app.context_processor
 def inject_fund_info():
     fund_id = request.args.get('fund_id')
@@ -166,6 +253,28 @@ def edit_config():
             return render_template('edit_config_select.html', available_funds=available_funds)
     return render_template('edit_config_select.html', available_funds=available_funds)
 
+@app.route('/import_configs', methods=['GET', 'POST'])
+def import_configs():
+    if request.method == 'POST':
+        from utils.config_import import import_configs as run_import, read_uploads
+        try:
+            uploads = [upload for upload in request.files.getlist('config_files') if upload.filename]
+            if not uploads:
+                raise ValueError('Please upload .json configs or a .zip archive of them.')
+            files = read_uploads((upload.filename, upload.read()) for upload in uploads)
+            report = run_import(files, apply=request.form.get('action') == 'Import',
+                                overwrite=request.form.get('overwrite') == 'on',
+                                require_prices=request.form.get('require_prices') == 'on')
+        except Exception as e:
+            if request.args.get('format') == 'json':
+                return jsonify({'error': f"{e}"}), 400
+            flash(f'Error reading configs: {e}', 'danger')
+            return redirect(url_for('import_configs'))
+        if request.args.get('format') == 'json':
+            return jsonify(report)
+        return render_template('import_configs.html', report=report)
+    return render_template('import_configs.html', report=None)
+
 @app.route('/rebalance', methods=['GET', 'POST'])
 def rebalance():
     fund_id = request.args.get('fund_id')
@@ -198,6 +307,24 @@ def rebalance():
                     current_holdings[fund] = float(value)
                 else:
                     current_holdings[fund] = 0.0
+            if request.form.get('mode') == 'shares':
+                from utils.fetcher import fetch_histories
+                max_trades = request.form.get('max_trades', type=int)
+                tolerance = request.form.get('tolerance', type=float)
+                if max_trades is not None and max_trades < 0:
+                    raise ValueError('The maximum number of trades cannot be negative.')
+                if tolerance is not None and not 0 <= tolerance < float('inf'):
+                    raise ValueError('The tolerance must be a non-negative number of percentage points.')
+                # Whole-share orders priced from the latest bar in the price store
+                with timer('fetch'):
+                    histories = fetch_histories(fund_list)
+                prices = {symbol: float(hist['price'].iloc[-1]) for symbol, hist in histories.items()
+                          if not isinstance(hist, Exception)}
+                allow_sells = request.form.get('allow_sells') == 'on'
+                orders, summary, age = calculate_share_rebalancing(current_holdings, amount_to_invest, prices, config,
+                                                                   allow_sells=allow_sells, max_trades=max_trades,
+                                                                   tolerance=tolerance)
+                return render_template('rebalance.html', orders=orders, summary=summary, age=age, fund_name=fund_name, fund_id=fund_id)
             amounts_to_invest, amounts_needed, age = calculate_rebalancing(current_holdings, amount_to_invest, config)
             return render_template('rebalance.html', amounts=amounts_to_invest, amounts_needed=amounts_needed, age=age, fund_name=fund_name, fund_id=fund_id)
         except Exception as e:
@@ -205,6 +332,52 @@ def rebalance():
             return redirect(url_for('rebalance', fund_id=fund_id))
     return render_template('rebalance.html', amounts=None, fund_list=fund_list, fund_name=fund_name, fund_id=fund_id)
 
+@app.route('/rebalance/bulk', methods=['GET', 'POST'])
+def rebalance_bulk():
+    fund_id = request.args.get('fund_id')
+    if not fund_id:
+        available_funds = get_available_funds()
+        if available_funds:
+            fund_id = available_funds[0]['id']
+        else:
+            flash('No funds available. Please create a fund first.', 'danger')
+            return redirect(url_for('edit_config'))
+    try:
+        config = load_config(fund_id)
+        fund_name = config.get('fund_name', fund_id)
+    except Exception as e:
+        flash(f'Error loading configuration: {e}', 'danger')
+        return redirect(url_for('edit_config'))
+
+    if request.method == 'POST':
+        try:
+            upload = request.files.get('holdings_file')
+            if upload is None or not upload.filename:
+                raise ValueError('Please upload a CSV or JSON holdings file.')
+            amounts = [float(amount) for amount in request.form.get('amounts', '').split(',') if amount.strip()]
+            if not amounts:
+                raise ValueError('Please enter at least one amount to invest.')
+            accounts, symbols, holdings = parse_bulk_holdings(upload.filename, upload.read())
+            amounts_to_invest, amounts_needed, target_symbols, age = calculate_rebalancing_batch(holdings, symbols, amounts, config)
+            results = []
+            for account_idx, account in enumerate(accounts):
+                for amount_idx, amount in enumerate(amounts):
+                    results.append({
+                        'account': account,
+                        'amount_to_invest': amount,
+                        'amounts': dict(zip(target_symbols, amounts_to_invest[account_idx, amount_idx].tolist())),
+                        'amounts_needed': dict(zip(target_symbols, amounts_needed[account_idx, amount_idx].tolist()))
+                    })
+            if request.args.get('format') == 'json':
+                return jsonify({'fund_id': fund_id, 'age': age, 'symbols': target_symbols, 'results': results})
+            return render_template('rebalance_bulk.html', results=results, symbols=target_symbols, age=age, fund_name=fund_name, fund_id=fund_id)
+        except Exception as e:
+            if request.args.get('format') == 'json':
+                return jsonify({'error': f"{e}"}), 400
+            flash(f'Error in bulk rebalancing: {e}', 'danger')
+            return redirect(url_for('rebalance_bulk', fund_id=fund_id))
+    return render_template('rebalance_bulk.html', results=None, fund_name=fund_name, fund_id=fund_id)
+
 @app.route('/plot')
 def plot():
     fund_id = request.args.get('fund_id')
@@ -226,16 +399,8 @@ def plot():
         flash('Glide path is empty. Please configure it first.', 'danger')
         return redirect(url_for('edit_config', fund_id=fund_id))
 
-    # Sort glide path entries by age to ensure correct interpolation
-    config['glide_path'] = sorted(config['glide_path'], key=lambda x: x['age'])
-
     ages = list(range(15, 96))  # Age range from 15 to 95
-    allocation_keys = config['glide_path'][0]['allocations'].keys()
-    allocations_over_age = {key: [] for key in allocation_keys}
-    for age in ages:
-        allocations = get_allocations(age, config)
-        for key in allocations_over_age:
-            allocations_over_age[key].append(allocations.get(key, 0))
+    allocations_over_age = {key: values.tolist() for key, values in get_glide_path(config).grid(ages).items()}
     return render_template('plot.html', ages=ages, allocations_over_age=allocations_over_age, fund_name=fund_name, fund_id=fund_id)
 
 @app.route('/fund_performance')
@@ -259,131 +424,411 @@ def fund_performance():
     for funds in config['funds'].values():
         for fund_info in funds:
             fund_symbols.append(fund_info['symbol'])
-    performance_data, historical_data = get_fund_performance(fund_symbols, config)
-    return render_template('fund_performance.html', performance_data=performance_data, historical_data=historical_data, fund_symbols=fund_symbols, fund_name=fund_name, fund_id=fund_id)
-
-def get_fund_performance(fund_symbols, config):
-    data = {}
-    historical_data = {}
-    # Calculate current age
-    current_year = datetime.datetime.now().year
-    date_of_birth = config.get('date_of_birth', 0)
-    age = current_year - date_of_birth
-    # Get current allocations
-    current_allocations = get_allocations(age, config)
-    # Build a mapping from fund symbol to allocation percentage
-    fund_allocations = {}
-    for asset_class, allocation_percentage in current_allocations.items():
-        funds = config['funds'].get(asset_class, [])
+    # 'ffill' carries prices forward and starts the overall series once every fund has data
+    fill = request.args.get('fill', 'zero')
+    if fill not in ('zero', 'ffill'):
+        fill = 'zero'
+    # Read the background worker's snapshot; build one here only if it has none for this config yet.
+    # Chart data is loaded on demand from /api/history
+    snapshot = get_snapshot(fund_id, config) if app.config['PRICE_REFRESH_INTERVAL'] else None
+    if snapshot is None:
+        snapshot = build_snapshot(config)
+        store_snapshot(fund_id, snapshot)
+    return render_template('fund_performance.html', performance_data=snapshot['performance_data'], as_of=snapshot['as_of'], fund_symbols=fund_symbols, fund_name=fund_name, fund_id=fund_id, fill=fill)
+
+@app.route('/refresh', methods=['POST'])
+def refresh():
+    fund_id = request.args.get('fund_id')
+    request_refresh()
+    flash('Price refresh started. Reload the page in a moment to see the latest data.', 'info')
+    return redirect(url_for('fund_performance', fund_id=fund_id))
+
+@app.route('/household')
+def household():
+    from utils.household import load_household_configs, build_household, resample_history
+    configs, config_errors = load_household_configs()
+    if not configs:
+        flash('No funds available. Please create a fund first.', 'danger')
+        return redirect(url_for('edit_config'))
+    for fund_id, error in config_errors.items():
+        flash(f"Skipped fund '{fund_id}': {error}", 'warning')
+    fill = request.args.get('fill', 'zero')
+    if fill not in ('zero', 'ffill'):
+        fill = 'zero'
+    try:
+        balances = get_household_balances(request.args)
+    except ValueError as e:
+        flash(f'Invalid balance: {e}', 'danger')
+        balances = {}
+    # Symbols shared between funds are fetched once for the whole household
+    result = build_household(configs, balances, fill=fill)
+    with timer('serialize'):
+        history = resample_history(result['history'], 'weekly')
+        chart = household_history_json(history)
+    return render_template('household.html', household=result, balances=balances, fill=fill, chart=chart)
+
+@app.route('/api/household')
+def api_household():
+    from utils.household import load_household_configs, build_household, resample_history
+    configs, config_errors = load_household_configs()
+    try:
+        balances = get_household_balances(request.args)
+        result = build_household(configs, balances, fill=request.args.get('fill', 'zero'))
+        start = request.args.get('start')
+        end = request.args.get('end')
+        if start:
+            start = datetime.date.fromisoformat(start).isoformat()
+        if end:
+            end = datetime.date.fromisoformat(end).isoformat()
+        history = resample_history(result['history'], request.args.get('frequency'), start, end)
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    with timer('serialize'):
+        return jsonify({
+            'funds': result['funds'],
+            'household': result['household'],
+            'holdings': result['holdings'],
+            'errors': {**result['errors'], **config_errors},
+            'history': household_history_json(history),
+            'as_of': result['as_of'].isoformat(timespec='seconds')
+        })
+
+@app.route('/metrics')
+def metrics():
+    return app.response_class(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/export/<fund_id>/history')
+def export_history(fund_id):
+    from utils.fetcher import fetch_histories
+    from utils.price_store import get_price_arrays
+    from utils.performance import weighted_portfolio_series, load_price_matrix, get_fund_allocations
+    try:
+        config = load_config(fund_id)
+    except FileNotFoundError as e:
+        return jsonify({'error': f"{e}"}), 404
+    fund_symbols = []
+    for funds in config['funds'].values():
         for fund_info in funds:
-            symbol = fund_info['symbol']
-            fund_percentage = fund_info['percentage']
-            total_percentage = (allocation_percentage * fund_percentage) / 100
-            fund_allocations[symbol] = total_percentage
-    # Define periods
-    periods = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
-    # Get historical data
-    for symbol in fund_symbols:
-        try:
-            fund = yf.Ticker(symbol)
-            hist = fund.history(period='max')
-            if hist.empty:
-                raise Exception(f"No historical data available for {symbol}")
-            if 'Adj Close' in hist.columns:
-                price_col = 'Adj Close'
-            else:
-                price_col = 'Close'
-            hist = hist.reset_index().rename(columns={price_col: 'price', 'Date': 'date'})
-            hist['date'] = hist['date'].dt.strftime('%Y-%m-%d')
-            historical_data[symbol] = hist[['date', 'price']]
-            if len(hist) >= 2:
-                current_price = float(hist['price'].iloc[-1])
-                previous_close = float(hist['price'].iloc[-2])
+            fund_symbols.append(fund_info['symbol'])
+    symbol = request.args.get('symbol')
+    fill = request.args.get('fill', 'zero')
+    try:
+        export_format = get_export_format(request.args)
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start_day = int(dates_to_days([datetime.date.fromisoformat(start).isoformat()])[0]) if start else None
+        end_day = int(dates_to_days([datetime.date.fromisoformat(end).isoformat()])[0]) if end else None
+        errors = []
+        if symbol == 'Overall Portfolio':
+            snapshot = get_snapshot(fund_id, config) if app.config['PRICE_REFRESH_INTERVAL'] else None
+            if fill == 'zero' and snapshot is not None:
+                hist = snapshot['overall_history']
             else:
-                current_price = float(hist['price'].iloc[-1])
-                previous_close = current_price
-            daily_change = current_price - previous_close
-            daily_change_percent = (daily_change / previous_close) * 100 if previous_close else 0
-            returns = {}
-            for period in periods:
-                hist_period = fund.history(period=period)
-                if hist_period.empty or len(hist_period) < 2:
-                    returns[period] = 'N/A'
-                    continue
-                if 'Adj Close' in hist_period.columns:
-                    price_col_period = 'Adj Close'
-                else:
-                    price_col_period = 'Close'
-                start_price = float(hist_period[price_col_period].iloc[0])
-                end_price = float(hist_period[price_col_period].iloc[-1])
-                period_return = ((end_price / start_price) - 1) * 100
-                returns[period] = round(period_return, 2)
-            allocation_percentage = fund_allocations.get(symbol, 0)
-            data[symbol] = {
-                'current_price': round(current_price, 2) if current_price else 'N/A',
-                'daily_change': round(daily_change, 2) if daily_change else 'N/A',
-                'daily_change_percent': round(daily_change_percent, 2) if daily_change_percent else 'N/A',
-                'allocation_percentage': round(allocation_percentage, 2),
-                'returns': returns
-            }
-        except Exception as e:
-            data[symbol] = {
-                'error': f"{e}"
-            }
-    # Calculate overall fund performance
-    total_allocations = sum(fund_allocations.values())
-    overall_returns = {}
-    for period in periods:
-        weighted_return = 0
-        total_weight = 0
-        for symbol in fund_symbols:
-            fund_data = data.get(symbol)
-            if fund_data and 'returns' in fund_data and fund_data['returns'].get(period) != 'N/A':
-                allocation = fund_allocations.get(symbol, 0)
-                fund_return = fund_data['returns'][period]
-                weighted_return += (allocation / total_allocations) * fund_return
-                total_weight += allocation / total_allocations
-        if total_weight > 0:
-            overall_returns[period] = round(weighted_return, 2)
+                fund_allocations = get_fund_allocations(config)
+                prices = load_price_matrix(fund_symbols)
+                weights = {s: fund_allocations.get(s, 0) / 100 for s in prices.columns}
+                hist = weighted_portfolio_series(prices, weights, fill=fill)
+            series = [(symbol, dates_to_days(hist['date'].to_numpy()), hist['price'].to_numpy(dtype=float))]
+        elif symbol is None or symbol in fund_symbols:
+            # Compact day/price arrays straight from the price cache; the rows are generated while streaming
+            arrays = fetch_histories([symbol] if symbol else fund_symbols, fetch=get_price_arrays)
+            series = [(s, *result) for s, result in arrays.items() if not isinstance(result, Exception)]
+            errors = [s for s, result in arrays.items() if isinstance(result, Exception)]
+            if symbol and errors:
+                raise arrays[symbol]
+        else:
+            return jsonify({'error': f"Symbol '{symbol}' is not part of fund '{fund_id}'."}), 404
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    except Exception as e:
+        return jsonify({'error': f"{e}"}), 502
+    name = f"{fund_id}-{symbol or 'all'}-history".replace(' ', '_').replace('/', '_')
+    response = export_response(name, HISTORY_COLUMNS, history_batches(series, start_day, end_day), export_format)
+    if errors:
+        response.headers['X-Export-Errors'] = ','.join(errors)
+    return response
+
+@app.route('/export/<fund_id>/performance')
+def export_performance(fund_id):
+    from utils.performance import PERIODS, get_fund_performance
+    try:
+        config = load_config(fund_id)
+    except FileNotFoundError as e:
+        return jsonify({'error': f"{e}"}), 404
+    fund_symbols = []
+    for funds in config['funds'].values():
+        for fund_info in funds:
+            fund_symbols.append(fund_info['symbol'])
+    try:
+        export_format = get_export_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    snapshot = get_snapshot(fund_id, config) if app.config['PRICE_REFRESH_INTERVAL'] else None
+    if snapshot is not None:
+        performance_data = snapshot['performance_data']
+    else:
+        performance_data, _ = get_fund_performance(fund_symbols, config, include_history=False)
+    columns, batches = performance_table(performance_data, PERIODS)
+    return export_response(f'{fund_id}-performance', columns, batches, export_format)
+
+@app.route('/export/<fund_id>/allocations')
+def export_allocations(fund_id):
+    try:
+        config = load_config(fund_id)
+    except FileNotFoundError as e:
+        return jsonify({'error': f"{e}"}), 404
+    try:
+        export_format = get_export_format(request.args)
+        min_age = request.args.get('min_age', 15, type=int)
+        max_age = request.args.get('max_age', 95, type=int)
+        if not config['glide_path']:
+            raise ValueError('Glide path is empty. Please configure it first.')
+        if min_age > max_age:
+            raise ValueError('min_age must not be greater than max_age.')
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    columns, batches = allocation_table(config, range(min_age, max_age + 1))
+    return export_response(f'{fund_id}-allocations', columns, batches, export_format)
+
+@app.route('/api/history/<fund_id>/<path:symbol>')
+def api_history(fund_id, symbol):
+    from utils.fetcher import fetch_histories
+    from utils.performance import weighted_portfolio_series, load_price_matrix, get_fund_allocations
+    from utils.downsampling import downsample_history, parse_points
+    try:
+        config = load_config(fund_id)
+    except FileNotFoundError as e:
+        return jsonify({'error': f"{e}"}), 404
+    fund_symbols = []
+    for funds in config['funds'].values():
+        for fund_info in funds:
+            fund_symbols.append(fund_info['symbol'])
+    fill = request.args.get('fill', 'zero')
+    frequency = request.args.get('frequency')
+    try:
+        points = parse_points(request.args.get('points'))
+        start = request.args.get('start')
+        end = request.args.get('end')
+        if start:
+            start = datetime.date.fromisoformat(start).isoformat()
+        if end:
+            end = datetime.date.fromisoformat(end).isoformat()
+        snapshot = get_snapshot(fund_id, config) if app.config['PRICE_REFRESH_INTERVAL'] else None
+        if symbol == 'Overall Portfolio' and fill == 'zero' and snapshot is not None:
+            hist = snapshot['overall_history']
+        elif symbol == 'Overall Portfolio':
+            fund_allocations = get_fund_allocations(config)
+            prices = load_price_matrix(fund_symbols)
+            weights = {s: fund_allocations.get(s, 0) / 100 for s in prices.columns}
+            hist = weighted_portfolio_series(prices, weights, fill=fill)
+        elif symbol in fund_symbols:
+            with timer('fetch'):
+                hist = fetch_histories([symbol])[symbol]
+            if isinstance(hist, Exception):
+                raise hist
+        else:
+            return jsonify({'error': f"Symbol '{symbol}' is not part of fund '{fund_id}'."}), 404
+        if start:
+            hist = hist[hist['date'] >= start]
+        if end:
+            hist = hist[hist['date'] <= end]
+        hist = downsample_history(hist, points=points, frequency=frequency)
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    except Exception as e:
+        return jsonify({'error': f"{e}"}), 502
+    with timer('serialize'):
+        body = json.dumps({
+            'symbol': symbol,
+            'dates': hist['date'].tolist(),
+            'prices': [round(float(price), 4) for price in hist['price']]
+        }).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+        if len(body) > 1024 and 'gzip' in request.accept_encodings:
+            response.set_data(gzip.compress(body))
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/backtest')
+def backtest():
+    fund_id = request.args.get('fund_id')
+    if not fund_id:
+        available_funds = get_available_funds()
+        if available_funds:
+            fund_id = available_funds[0]['id']
         else:
-            overall_returns[period] = 'N/A'
-    data['Overall Portfolio'] = {
-        'current_price': 'N/A',
-        'daily_change': 'N/A',
-        'daily_change_percent': 'N/A',
-        'allocation_percentage': 100.0,
-        'returns': overall_returns
+            flash('No funds available. Please create a fund first.', 'danger')
+            return redirect(url_for('edit_config'))
+    try:
+        config = load_config(fund_id)
+        fund_name = config.get('fund_name', fund_id)
+    except Exception as e:
+        flash(f'Error loading configuration: {e}', 'danger')
+        return redirect(url_for('edit_config'))
+
+    if not config['glide_path']:
+        flash('Glide path is empty. Please configure it first.', 'danger')
+        return redirect(url_for('edit_config', fund_id=fund_id))
+    try:
+        params = get_backtest_params(request.args)
+    except ValueError as e:
+        flash(f'Invalid backtest parameters: {e}', 'danger')
+        return redirect(url_for('backtest', fund_id=fund_id))
+    return render_template('backtest.html', params=params, fund_name=fund_name, fund_id=fund_id)
+
+@app.route('/api/backtest/<fund_id>')
+def api_backtest(fund_id):
+    from utils.performance import load_price_matrix
+    from utils.downsampling import downsample_history, parse_points
+    from utils.backtest import run_backtest
+    try:
+        config = load_config(fund_id)
+    except FileNotFoundError as e:
+        return jsonify({'error': f"{e}"}), 404
+    fund_symbols = []
+    for funds in config['funds'].values():
+        for fund_info in funds:
+            fund_symbols.append(fund_info['symbol'])
+    try:
+        params = get_backtest_params(request.args)
+        points = parse_points(request.args.get('points'))
+        if params['start']:
+            datetime.date.fromisoformat(params['start'])
+        if params['end']:
+            datetime.date.fromisoformat(params['end'])
+        prices = load_price_matrix(fund_symbols)
+        with timer('backtest'):
+            history, summary = run_backtest(prices, config, **params)
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    if points is not None:
+        history = history.rename(columns={'value': 'price'})
+        history = downsample_history(history, points=points).rename(columns={'price': 'value'})
+    return jsonify({
+        'fund_id': fund_id,
+        'summary': summary,
+        'dates': history['date'].tolist(),
+        'values': [round(float(value), 2) for value in history['value']],
+        'invested': [round(float(value), 2) for value in history['invested']]
+    })
+
+@app.route('/projection')
+def projection():
+    fund_id = request.args.get('fund_id')
+    if not fund_id:
+        available_funds = get_available_funds()
+        if available_funds:
+            fund_id = available_funds[0]['id']
+        else:
+            flash('No funds available. Please create a fund first.', 'danger')
+            return redirect(url_for('edit_config'))
+    try:
+        config = load_config(fund_id)
+        fund_name = config.get('fund_name', fund_id)
+    except Exception as e:
+        flash(f'Error loading configuration: {e}', 'danger')
+        return redirect(url_for('edit_config'))
+
+    if not config['glide_path']:
+        flash('Glide path is empty. Please configure it first.', 'danger')
+        return redirect(url_for('edit_config', fund_id=fund_id))
+    return render_template('projection.html', params=get_projection_params(request.args), fund_name=fund_name, fund_id=fund_id)
+
+@app.route('/api/projection/<fund_id>')
+def api_projection(fund_id):
+    from utils.performance import load_price_matrix
+    from utils.projection import asset_class_annual_returns, run_projection
+    try:
+        config = load_config(fund_id)
+    except FileNotFoundError as e:
+        return jsonify({'error': f"{e}"}), 404
+    try:
+        params = get_projection_params(request.args)
+        annual_returns = None
+        if params['method'] == 'bootstrap':
+            fund_symbols = []
+            for funds in config['funds'].values():
+                for fund_info in funds:
+                    fund_symbols.append(fund_info['symbol'])
+            annual_returns = asset_class_annual_returns(load_price_matrix(fund_symbols), config)
+        with timer('simulate'):
+            result = run_projection(config, annual_returns=annual_returns, **params)
+    except ValueError as e:
+        return jsonify({'error': f"{e}"}), 400
+    return jsonify({'fund_id': fund_id, **result})
+
+def get_projection_params(args):
+    return {
+        'initial_amount': args.get('initial_amount', 100000.0, type=float),
+        'annual_contribution': args.get('annual_contribution', 0.0, type=float),
+        'retirement_age': args.get('retirement_age', 65, type=int),
+        'annual_withdrawal': args.get('annual_withdrawal', 0.0, type=float),
+        'paths': min(args.get('paths', 10000, type=int), MAX_PROJECTION_PATHS),
+        'method': args.get('method', 'parametric'),
+        'seed': args.get('seed', type=int)
     }
-    # Calculate overall historical data
-    overall_hist = None
-    for symbol in fund_symbols:
-        hist = historical_data.get(symbol)
-        allocation = fund_allocations.get(symbol, 0) / 100
-        if hist is not None:
-            hist = pd.DataFrame(hist)
-            hist['price'] = pd.to_numeric(hist['price'])
-            hist['weighted_price'] = hist['price'] * allocation
-            if overall_hist is None:
-                overall_hist = hist[['date', 'weighted_price']].copy()
-            else:
-                overall_hist = pd.merge(overall_hist, hist[['date', 'weighted_price']], on='date', how='outer', suffixes=('', '_'+symbol))
-                overall_hist.fillna(0, inplace=True)
-                overall_hist['weighted_price'] = overall_hist['weighted_price'] + overall_hist['weighted_price_'+symbol]
-                overall_hist.drop(columns=['weighted_price_'+symbol], inplace=True)
-    if overall_hist is not None:
-        overall_hist['date'] = pd.to_datetime(overall_hist['date'])
-        overall_hist.sort_values('date', inplace=True)
-        overall_hist = overall_hist.groupby('date').sum().reset_index()
-        overall_hist['date'] = overall_hist['date'].dt.strftime('%Y-%m-%d')
-        historical_data['Overall Portfolio'] = overall_hist[['date', 'weighted_price']].rename(columns={'weighted_price': 'price'}).to_dict(orient='records')
-    # Convert individual fund historical data to list of dicts
-    for symbol in fund_symbols:
-        hist = historical_data.get(symbol)
-        if hist is not None:
-            hist = pd.DataFrame(hist)
-            hist['date'] = pd.to_datetime(hist['date']).dt.strftime('%Y-%m-%d')
-            historical_data[symbol] = hist.to_dict(orient='records')
-    return data, historical_data
+
+def get_export_format(args):
+    export_format = args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    return export_format
+
+def export_response(name, columns, batches, export_format):
+    if export_format == 'parquet':
+        # Row groups are written to a temporary file that is streamed back and deleted once sent
+        export_file = tempfile.TemporaryFile()
+        try:
+            write_parquet(columns, batches, export_file)
+        except ImportError:
+            export_file.close()
+            return jsonify({'error': 'Parquet export requires pyarrow (pip install pyarrow).'}), 501
+        export_file.seek(0)
+        return send_file(export_file, mimetype='application/vnd.apache.parquet', as_attachment=True,
+                         download_name=f'{name}.parquet')
+    response = app.response_class(stream_csv(columns, batches), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+    return response
+
+def get_household_balances(args):
+    # Account balances per fund from balance_<fund_id> query arguments; blank ones are ignored
+    balances = {}
+    for key, value in args.items():
+        if key.startswith('balance_') and value.strip():
+            balance = float(value)
+            if not 0 <= balance < float('inf'):
+                raise ValueError(f"balance for '{key[len('balance_'):]}' must be a non-negative number")
+            balances[key[len('balance_'):]] = balance
+    return balances
+
+def household_history_json(history):
+    # date x series frame -> {'dates': [...], 'series': {name: [price or None, ...]}}
+    return {
+        'dates': history.index.strftime('%Y-%m-%d').tolist(),
+        'series': {name: [None if value != value else round(float(value), 4) for value in history[name]]
+                   for name in history.columns}
+    }
+
+def get_backtest_params(args):
+    params = {
+        'initial_amount': args.get('initial_amount', 10000.0, type=float),
+        'contribution': args.get('contribution', 0.0, type=float),
+        'frequency': args.get('frequency', 'monthly'),
+        'threshold': args.get('threshold', 5.0, type=float),
+        'start': args.get('start') or None,
+        'end': args.get('end') or None
+    }
+    for name in ('initial_amount', 'contribution', 'threshold'):
+        if not 0 <= params[name] < float('inf'):
+            raise ValueError(f"{name} must be a non-negative number")
+    return params
 
 if __name__ == '__main__':
     app.run(debug=True)
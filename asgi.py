@@ -0,0 +1,70 @@
+# asgi.py
+#
+# Async serving mode for the same Flask routes and templates:
+#     uvicorn asgi:application --workers 2
+#
+# Flask views run on a pool of WSGI threads (a2wsgi). For endpoints that need price data,
+# the fund's symbols are first fetched as awaitable tasks on the event loop, coalesced with
+# every other in-flight request for the same symbols, so the view only reads warm caches and
+# slow upstream fetches never hold a view thread. The results, failures included, and the time
+# spent are handed to the view through the scope. Needs `pip install uvicorn a2wsgi`.
+
+import asyncio
+import time
+from urllib.parse import parse_qs
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import HTTPException
+from app import app, PREFETCH_SCOPE_KEY
+from utils.async_fetcher import fetch_histories_async
+from utils.config_manager import load_config, get_available_funds
+from utils.household import household_symbols, load_household_configs
+
+WSGI_THREADS = 8
+# Endpoints whose fund prices are fetched on the event loop before the view runs
+PREFETCH_ENDPOINTS = {'fund_performance', 'api_history', 'api_backtest', 'api_projection',
+                      'export_history', 'export_performance', 'household', 'api_household'}
+
+_wsgi_app = WSGIMiddleware(app, workers=WSGI_THREADS)
+_url_adapter = app.url_map.bind('localhost')
+
+def _prefetch_symbols(scope):
+    # Symbols the request is going to read, or an empty list if it needs no price data
+    try:
+        endpoint, view_args = _url_adapter.match(scope['path'], method=scope['method'])
+    except HTTPException:
+        return []
+    if endpoint not in PREFETCH_ENDPOINTS:
+        return []
+    if endpoint in ('household', 'api_household'):
+        configs, _ = load_household_configs()
+        return household_symbols(configs)
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if endpoint == 'api_projection' and query.get('method', ['parametric'])[0] != 'bootstrap':
+        return []
+    fund_id = view_args.get('fund_id') or query.get('fund_id', [None])[0]
+    try:
+        if not fund_id:
+            available_funds = get_available_funds()
+            if not available_funds:
+                return []
+            fund_id = available_funds[0]['id']
+        config = load_config(fund_id)
+    except Exception:
+        return []  # The view reports the error
+    symbols = [fund_info['symbol'] for funds in config['funds'].values() for fund_info in funds]
+    symbol = view_args.get('symbol') or query.get('symbol', [None])[0]
+    if symbol in symbols:
+        return [symbol]
+    return symbols
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        # Config files are read on the default executor so the event loop never touches the disk
+        symbols = await asyncio.get_running_loop().run_in_executor(None, _prefetch_symbols, scope)
+        if symbols:
+            started = time.perf_counter()
+            results = await fetch_histories_async(symbols)
+            # a2wsgi exposes the scope as environ['asgi.scope']; the view records the phase and
+            # reuses the results, so failed symbols are reported rather than fetched again
+            scope = {**scope, PREFETCH_SCOPE_KEY: (time.perf_counter() - started, results)}
+    await _wsgi_app(scope, receive, send)
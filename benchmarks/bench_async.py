@@ -0,0 +1,154 @@
+# benchmarks/bench_async.py
+#
+# Load test of the sync (gunicorn sync workers) and async (uvicorn + asgi.py) serving modes
+# against the local stand-in price server, with a mix of cold /fund_performance requests and
+# cheap pages (/plot, /rebalance, /edit_config, /):
+#     python -m benchmarks.bench_async --workers 2 --clients 16 --latency 1.0
+#
+# Needs `pip install gunicorn uvicorn a2wsgi`. Reports p50/p95/p99 latency per request kind and
+# the number of upstream price requests each mode made.
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from benchmarks.price_server import start_price_server
+from benchmarks.synthetic import write_fund_configs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHEAP_PAGES = ['/', '/plot?fund_id={fund_id}', '/rebalance?fund_id={fund_id}', '/edit_config?fund_id={fund_id}']
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def server_command(mode, port, workers):
+    if mode == 'sync':
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--worker-class', 'sync',
+                '--timeout', '600', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'benchmarks.serve_app:app']
+    return [sys.executable, '-m', 'uvicorn', 'benchmarks.serve_app:application', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with code {process.returncode}')
+        try:
+            urllib.request.urlopen(f'{base_url}/metrics', timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {base_url} did not start within {timeout} seconds')
+
+def make_schedule(num_funds, clients, requests_per_client, slow_share, seed):
+    # Each client's list of (kind, path); slow requests pick from few funds so they overlap
+    rng = random.Random(seed)
+    schedule = []
+    for _ in range(clients):
+        requests = []
+        for _ in range(requests_per_client):
+            fund_id = f'bench{rng.randrange(num_funds)}'
+            if rng.random() < slow_share:
+                requests.append(('slow', f'/fund_performance?fund_id={fund_id}'))
+            else:
+                requests.append(('cheap', rng.choice(CHEAP_PAGES).format(fund_id='bench0')))
+        schedule.append(requests)
+    return schedule
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+    return {
+        'count': len(ordered),
+        'p50': round(pick(0.50), 4),
+        'p95': round(pick(0.95), 4),
+        'p99': round(pick(0.99), 4),
+        'max': round(ordered[-1], 4),
+        'mean': round(statistics.fmean(ordered), 4),
+    }
+
+def run_load(base_url, schedule):
+    results = []
+    results_lock = threading.Lock()
+    barrier = threading.Barrier(len(schedule))
+    def client(requests):
+        barrier.wait()
+        for kind, path in requests:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=600) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = None
+            with results_lock:
+                results.append((kind, time.perf_counter() - start, status))
+    threads = [threading.Thread(target=client, args=(requests,)) for requests in schedule]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+def run_mode(mode, args, schedule):
+    with tempfile.TemporaryDirectory() as root:
+        write_fund_configs(root, args.funds, args.symbols_per_class, distinct_symbols=True)
+        price_server = start_price_server(latency=args.latency, years=args.years)
+        port = free_port()
+        env = dict(os.environ, BENCH_ROOT=root,
+                   PRICE_SERVER_URL=f'http://127.0.0.1:{price_server.server_address[1]}')
+        process = subprocess.Popen(server_command(mode, port, args.workers), cwd=REPO_ROOT, env=env)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            wait_until_ready(base_url, process)
+            results, wall = run_load(base_url, schedule)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            price_server.shutdown()
+        with price_server.calls_lock:
+            upstream_calls = sum(price_server.calls.values())
+    summary = {'wall_seconds': round(wall, 2), 'upstream_calls': upstream_calls,
+               'errors': sum(1 for _, _, status in results if status != 200)}
+    summary['all'] = percentiles([latency for _, latency, _ in results])
+    for kind in ('cheap', 'slow'):
+        summary[kind] = percentiles([latency for k, latency, _ in results if k == kind])
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the sync and async serving modes.')
+    parser.add_argument('--modes', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=12, help='requests per client')
+    parser.add_argument('--slow-share', type=float, default=0.25, help='share of /fund_performance requests')
+    parser.add_argument('--funds', type=int, default=12, help='funds with distinct symbols')
+    parser.add_argument('--symbols-per-class', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds per upstream request')
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    schedule = make_schedule(args.funds, args.clients, args.requests, args.slow_share, args.seed)
+    results = {'params': vars(args), 'modes': {mode: run_mode(mode, args, schedule) for mode in args.modes}}
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
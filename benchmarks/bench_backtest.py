@@ -0,0 +1,53 @@
+# benchmarks/bench_backtest.py
+#
+# Times run_backtest over synthetic daily prices:
+#     python -m benchmarks.bench_backtest --years 30 --funds 15
+
+import argparse
+import json
+import time
+from utils.performance import build_price_matrix
+from utils.backtest import FREQUENCIES, run_backtest
+from benchmarks.fake_provider import FakePriceProvider
+
+ASSET_CLASSES = ['us_stock', 'intl_stock', 'us_bond', 'intl_bond', 'short_term_tips']
+
+def make_config(num_funds):
+    funds = {asset_class: [] for asset_class in ASSET_CLASSES}
+    for i in range(num_funds):
+        funds[ASSET_CLASSES[i % len(ASSET_CLASSES)]].append({'symbol': f'SYM{i}', 'percentage': 0.0})
+    for fund_list in funds.values():
+        for fund_info in fund_list:
+            fund_info['percentage'] = 100.0 / len(fund_list)
+    return {
+        'fund_name': 'Backtest Benchmark',
+        'date_of_birth': 1970,
+        'glide_path': [
+            {'age': 20, 'allocations': {'us_stock': 60.0, 'intl_stock': 30.0, 'us_bond': 7.0, 'intl_bond': 3.0, 'short_term_tips': 0.0}},
+            {'age': 65, 'allocations': {'us_stock': 30.0, 'intl_stock': 20.0, 'us_bond': 30.0, 'intl_bond': 12.0, 'short_term_tips': 8.0}},
+        ],
+        'funds': funds,
+    }
+
+def run(years, num_funds, repeat):
+    config = make_config(num_funds)
+    provider = FakePriceProvider(years=years)
+    symbols = [fund_info['symbol'] for fund_list in config['funds'].values() for fund_info in fund_list]
+    prices = build_price_matrix({symbol: provider(symbol) for symbol in symbols})
+    results = {'years': years, 'funds': num_funds, 'dates': len(prices)}
+    for frequency in FREQUENCIES:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_backtest(prices, config, initial_amount=10000, contribution=500, frequency=frequency, threshold=2.0)
+            timings.append(time.perf_counter() - start)
+        results[f'{frequency}_seconds'] = round(min(timings), 4)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized backtest engine.')
+    parser.add_argument('--years', type=int, default=30)
+    parser.add_argument('--funds', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.years, args.funds, args.repeat), indent=4))
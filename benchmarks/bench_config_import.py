@@ -0,0 +1,74 @@
+# benchmarks/bench_config_import.py
+#
+# Compares importing synthetic fund configs one at a time, as through /edit_config, with the
+# bulk pipeline in utils/config_import.py, serially and on a process pool:
+#     python -m benchmarks.bench_config_import --funds 500 --workers 4
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from utils import config_manager, price_store
+from utils.config_import import import_configs, read_source, validate_config
+from utils.config_manager import get_available_funds, save_config
+from benchmarks.fake_provider import FakePriceProvider
+from benchmarks.synthetic import write_fund_configs, fund_symbols
+
+def import_one_by_one(files):
+    # Validate, check symbols, save and reload the fund list for every file on its own
+    for source, data in files:
+        config = json.loads(data)
+        errors, _, symbols = validate_config(config)
+        if not errors and all(price_store.has_price_history(symbol) for symbol in symbols):
+            save_config(config, os.path.splitext(os.path.basename(source))[0])
+        get_available_funds()
+
+def run(num_funds, symbols_per_class, glide_points, workers):
+    previous_dir = os.getcwd()
+    previous_store = price_store.PRICE_STORE_DIR
+    timings = {}
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, 'incoming')
+        write_fund_configs(source, num_funds, symbols_per_class, glide_points)
+        files = read_source(os.path.join(source, 'funds'))
+        price_store.PRICE_STORE_DIR = os.path.join(root, 'prices')
+        provider = FakePriceProvider(years=3)
+        for symbol in fund_symbols(json.loads(files[0][1])):
+            price_store.update_price_history(symbol, provider=provider)
+        runs = (
+            ('one_by_one', lambda: import_one_by_one(files)),
+            ('bulk_serial', lambda: import_configs(files, apply=True, workers=1)),
+            ('bulk_parallel', lambda: import_configs(files, apply=True, workers=workers)),
+        )
+        try:
+            for label, func in runs:
+                # Every run imports into an empty funds/ directory of its own
+                os.chdir(tempfile.mkdtemp(dir=root))
+                config_manager._config_cache.clear()
+                config_manager._fund_index.clear()
+                start = time.perf_counter()
+                func()
+                timings[label] = time.perf_counter() - start
+                assert len(get_available_funds()) == num_funds
+        finally:
+            os.chdir(previous_dir)
+            price_store.PRICE_STORE_DIR = previous_store
+            config_manager._config_cache.clear()
+            config_manager._fund_index.clear()
+    return {
+        'funds': num_funds,
+        'workers': workers,
+        'cpus': os.cpu_count(),
+        **{f'{label}_seconds': round(seconds, 3) for label, seconds in timings.items()},
+        'speedup': round(timings['one_by_one'] / timings['bulk_parallel'], 2),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark bulk fund config validation and import.')
+    parser.add_argument('--funds', type=int, default=500)
+    parser.add_argument('--symbols-per-class', type=int, default=6)
+    parser.add_argument('--glide-points', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.funds, args.symbols_per_class, args.glide_points, args.workers), indent=4))
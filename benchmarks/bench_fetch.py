@@ -0,0 +1,46 @@
+# benchmarks/bench_fetch.py
+#
+# Compares sequential and concurrent cold-store fetches against a fake provider:
+#     python -m benchmarks.bench_fetch --symbols 20 --latency 0.3 --workers 8
+
+import argparse
+import json
+import tempfile
+import time
+from utils import price_store
+from utils.fetcher import fetch_histories
+from benchmarks.fake_provider import FakePriceProvider
+
+def run(num_symbols, latency, workers, failures):
+    symbols = [f'SYM{i}' for i in range(num_symbols)]
+    provider = FakePriceProvider(latency=latency, fail_symbols=symbols[:failures])
+    price_store.set_price_provider(provider)
+    timings = {}
+    try:
+        for label, max_workers in (('sequential', 1), ('concurrent', workers)):
+            with tempfile.TemporaryDirectory() as store_dir:
+                price_store.PRICE_STORE_DIR = store_dir
+                start = time.perf_counter()
+                results = fetch_histories(symbols, max_workers=max_workers, retries=0)
+                timings[label] = time.perf_counter() - start
+        errors = sorted(symbol for symbol, result in results.items() if isinstance(result, Exception))
+    finally:
+        price_store.set_price_provider(None)
+    return {
+        'symbols': num_symbols,
+        'latency': latency,
+        'workers': workers,
+        'sequential_seconds': round(timings['sequential'], 3),
+        'concurrent_seconds': round(timings['concurrent'], 3),
+        'speedup': round(timings['sequential'] / timings['concurrent'], 2),
+        'errors': errors,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the concurrent price fetch layer.')
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--failures', type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.symbols, args.latency, args.workers, args.failures), indent=4))
@@ -0,0 +1,53 @@
+# benchmarks/bench_import.py
+#
+# Measures cold-start import cost of the app with `python -X importtime`:
+#     python -m benchmarks.bench_import --module app --repeat 5
+#
+# Heavy dependencies (pandas, yfinance, matplotlib) should not show up in the report;
+# they are loaded lazily on the routes that need them.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('pandas', 'yfinance', 'matplotlib', 'scipy')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_profile(module):
+    # {module name: cumulative microseconds} for one cold interpreter
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or line.rstrip().endswith('imported package'):
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+def run(module, repeat):
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], cwd=REPO_ROOT, check=True)
+        wall_times.append(time.perf_counter() - start)
+    profile = import_profile(module)
+    slowest = sorted(((name, us) for name, us in profile.items() if name != module),
+                     key=lambda item: item[1], reverse=True)[:10]
+    return {
+        'module': module,
+        'cold_start_seconds': round(min(wall_times), 3),
+        'import_seconds': round(profile.get(module, 0) / 1e6, 3),
+        'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in profile],
+        'slowest_imports_ms': {name: round(us / 1000, 1) for name, us in slowest},
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cold-start import time.')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.module, args.repeat), indent=4))
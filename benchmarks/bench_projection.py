@@ -0,0 +1,43 @@
+# benchmarks/bench_projection.py
+#
+# Times the Monte Carlo projection with the default fund config:
+#     python -m benchmarks.bench_projection --paths 100000 --workers 4
+
+import argparse
+import json
+import os
+import time
+from utils.config_manager import load_config
+from utils.projection import run_projection
+
+def run(paths, workers, fund_id, method):
+    config = load_config(fund_id)
+    annual_returns = None
+    if method == 'bootstrap':
+        import numpy as np
+        import pandas as pd
+        # Synthetic 40 years of asset-class returns so the benchmark stays offline
+        rng = np.random.default_rng(0)
+        classes = list(config['funds'].keys())
+        annual_returns = pd.DataFrame(rng.normal(0.05, 0.12, size=(40, len(classes))), columns=classes)
+    start = time.perf_counter()
+    result = run_projection(config, initial_amount=100000, annual_contribution=12000, annual_withdrawal=40000,
+                            paths=paths, method=method, annual_returns=annual_returns, seed=42, workers=workers)
+    elapsed = time.perf_counter() - start
+    return {
+        'paths': paths,
+        'workers': workers,
+        'method': method,
+        'years': len(result['ages']) - 1,
+        'seconds': round(elapsed, 3),
+        'median_final_wealth': result['percentiles']['50'][-1],
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the Monte Carlo retirement projection.')
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--fund-id', default='config1')
+    parser.add_argument('--method', choices=['parametric', 'bootstrap'], default='parametric')
+    args = parser.parse_args()
+    print(json.dumps(run(args.paths, args.workers, args.fund_id, args.method), indent=4))
@@ -0,0 +1,286 @@
+# benchmarks/bench_suite.py
+#
+# Reproducible benchmarks for the hot paths and every page/API route, fully offline:
+#     python -m benchmarks.bench_suite --funds 50 --symbols-per-class 6 --output before.json
+#     python -m benchmarks.bench_suite --compare before.json
+#
+# Runs in a temporary directory with synthetic fund configs (benchmarks/synthetic.py) and
+# FakePriceProvider standing in for yfinance. Each case reports min/median/mean/p95 seconds
+# per call; --compare diffs medians against an earlier results file.
+
+import argparse
+import copy
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+import pandas as pd
+from utils import config_manager, price_store, refresher
+from utils.allocation import get_allocations
+from utils.config_manager import load_config, get_available_funds
+from utils.rebalancing import calculate_rebalancing
+from utils.fetcher import fetch_histories
+from utils.performance import get_fund_performance
+from utils.household import build_household
+from utils.refresher import build_snapshot
+from utils.price_cache import get_price_cache
+from utils.performance_cache import get_performance_cache
+from benchmarks.fake_provider import FakePriceProvider
+from benchmarks.synthetic import write_fund_configs, fund_symbols
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+def summarize(timings):
+    ordered = sorted(timings)
+    mean = statistics.fmean(ordered)
+    return {
+        'rounds': len(ordered),
+        'min': round(ordered[0], 6),
+        'median': round(statistics.median(ordered), 6),
+        'mean': round(mean, 6),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        'max': round(ordered[-1], 6),
+        'stddev': round(statistics.stdev(ordered), 6) if len(ordered) > 1 else 0.0,
+        'ops': round(1 / mean, 2) if mean else None,
+    }
+
+def bench(func, rounds, warmup=1, setup=None):
+    # pytest-benchmark style: warm up, then time `rounds` calls; setup runs untimed before each call
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+    timings = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def clear_config_caches():
+    config_manager._config_cache.clear()
+    config_manager._fund_index.clear()
+
+def function_cases(fund_ids, rounds):
+    config = load_config(fund_ids[0])
+    symbols = fund_symbols(config)
+    holdings = {symbol: 1000.0 * (i + 1) for i, symbol in enumerate(symbols)}
+    histories = fetch_histories(symbols)
+    ages = range(15, 96)
+    configs = {fund_id: load_config(fund_id) for fund_id in fund_ids}
+    # What the per-fund /fund_performance pages compute, once for every fund
+    per_fund = lambda: [build_snapshot(config) for config in configs.values()]
+    edited = copy.deepcopy(config)
+    def edit_config():
+        # A different fund split in one asset class every round, as saved from /edit_config
+        asset_class = next(iter(edited['funds']))
+        edited['funds'][asset_class][0]['percentage'] += 0.01
+    appended = dict(histories)
+    def append_bar():
+        # One more daily bar for every symbol, as a price refresh adds after each close
+        for symbol, hist in appended.items():
+            last = hist.iloc[-1]
+            next_day = (datetime.date.fromisoformat(last['date']) + datetime.timedelta(days=1)).isoformat()
+            appended[symbol] = pd.concat([hist, pd.DataFrame({'date': [next_day], 'price': [last['price']]})], ignore_index=True)
+    return {
+        f'get_allocations[{len(ages)} ages]': bench(lambda: [get_allocations(age, config) for age in ages], rounds),
+        'calculate_rebalancing': bench(lambda: calculate_rebalancing(holdings, 10000.0, config), rounds),
+        'get_fund_performance[preloaded]': bench(lambda: get_fund_performance(symbols, config, histories=histories), rounds),
+        'get_fund_performance[price cache]': bench(lambda: get_fund_performance(symbols, config), rounds),
+        'get_fund_performance[price store]': bench(lambda: get_fund_performance(symbols, config), rounds,
+                                                   setup=get_price_cache().clear),
+        'get_fund_performance[no performance cache]': bench(lambda: get_fund_performance(symbols, config, histories=histories),
+                                                            rounds, setup=get_performance_cache().clear),
+        'build_snapshot[unchanged]': bench(lambda: build_snapshot(config, histories), rounds),
+        'build_snapshot[config edit]': bench(lambda: build_snapshot(edited, histories), rounds, setup=edit_config),
+        'build_snapshot[new daily bar]': bench(lambda: build_snapshot(config, appended), rounds, setup=append_bar),
+        f'household[{len(configs)} funds, per-fund loop]': bench(per_fund, rounds),
+        f'household[{len(configs)} funds, build_household]': bench(lambda: build_household(configs), rounds),
+        'get_available_funds[cold]': bench(get_available_funds, rounds, setup=clear_config_caches),
+        'get_available_funds[warm]': bench(get_available_funds, rounds),
+    }
+
+def bulk_holdings_form(symbols):
+    # Ten accounts of holdings as a CSV upload for /rebalance/bulk
+    rows = ['account,' + ','.join(symbols)]
+    rows += [f'account{i},' + ','.join(str(1000.0 * (i + j + 1)) for j in range(len(symbols))) for i in range(10)]
+    return lambda: {'amounts': '500, 1000, 5000', 'holdings_file': (io.BytesIO('\n'.join(rows).encode('utf-8')), 'holdings.csv')}
+
+def edit_config_form(fund_id, config):
+    # The form /edit_config posts when a fund is saved unchanged
+    form = {'action': 'Save', 'fund_id': fund_id, 'date_of_birth': str(config['date_of_birth'])}
+    for asset_class, funds in config['funds'].items():
+        form[f'{asset_class}_symbol'] = [fund_info['symbol'] for fund_info in funds]
+        form[f'{asset_class}_percentage'] = [str(fund_info['percentage']) for fund_info in funds]
+    form['age'] = [str(entry['age']) for entry in config['glide_path']]
+    for asset_class in ('us_stock', 'intl_stock', 'us_bond', 'intl_bond', 'short_term_tips'):
+        form[asset_class] = [str(entry['allocations'].get(asset_class, 0.0)) for entry in config['glide_path']]
+    return lambda: form
+
+def import_configs_form():
+    # Every synthetic fund config as one zip upload, validated without importing
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for fund in get_available_funds():
+            zf.write(os.path.join('funds', f"{fund['id']}.json"), f"{fund['id']}.json")
+    data = archive.getvalue()
+    return lambda: {'action': 'Validate', 'config_files': (io.BytesIO(data), 'funds.zip')}
+
+def route_cases(fund_id, symbol, requests_per_route):
+    from app import app
+    # Keep all work on the request path so every request measures the same thing
+    app.config['PRICE_REFRESH_INTERVAL'] = 0
+    client = app.test_client()
+    config = load_config(fund_id)
+    rebalance_form = lambda: {'amount_to_invest': '10000'}
+    # (method, url, form factory for POSTs); uploads need a fresh file object per request
+    routes = [
+        ('GET', '/'),
+        ('GET', f'/rebalance?fund_id={fund_id}'),
+        ('POST', f'/rebalance?fund_id={fund_id}', rebalance_form),
+        ('GET', f'/rebalance/bulk?fund_id={fund_id}'),
+        ('POST', f'/rebalance/bulk?fund_id={fund_id}&format=json', bulk_holdings_form(fund_symbols(config))),
+        ('GET', f'/plot?fund_id={fund_id}'),
+        ('GET', f'/fund_performance?fund_id={fund_id}'),
+        ('GET', '/household'),
+        ('GET', '/api/household?frequency=weekly'),
+        ('GET', f'/api/history/{fund_id}/{symbol}?points=500'),
+        ('GET', f'/api/history/{fund_id}/Overall%20Portfolio?points=500'),
+        ('GET', f'/backtest?fund_id={fund_id}'),
+        ('GET', f'/api/backtest/{fund_id}?contribution=500&points=500'),
+        ('GET', f'/projection?fund_id={fund_id}'),
+        ('GET', f'/api/projection/{fund_id}?paths=2000&seed=1'),
+        ('GET', f'/export/{fund_id}/history'),
+        ('GET', f'/export/{fund_id}/history?symbol=Overall%20Portfolio'),
+        ('GET', f'/export/{fund_id}/performance'),
+        ('GET', f'/export/{fund_id}/allocations?min_age=0&max_age=120'),
+        ('GET', f'/edit_config?fund_id={fund_id}'),
+        ('POST', '/edit_config', edit_config_form(fund_id, config)),
+        ('GET', '/import_configs'),
+        ('POST', '/import_configs?format=json', import_configs_form()),
+        ('GET', '/metrics'),
+        # Last, since it starts a background refresh of every symbol
+        ('POST', '/refresh', lambda: {}),
+    ]
+    results = {}
+    for method, url, *form in routes:
+        statuses = set()
+        def request_once():
+            if method == 'POST':
+                response = client.post(url, data=form[0](), content_type='multipart/form-data')
+            else:
+                response = client.get(url)
+            # Streamed bodies are only produced when read
+            response.get_data()
+            statuses.add(response.status_code)
+        stats = bench(request_once, requests_per_route)
+        stats['statuses'] = sorted(statuses)
+        results[f'{method} {url}'] = stats
+    # Let that refresh finish before the temporary price store goes away
+    with refresher._refresh_running:
+        pass
+    return results
+
+def compare(current, previous_path, threshold):
+    with open(previous_path) as f:
+        previous = json.load(f)['cases']
+    comparison = {}
+    for name, stats in current.items():
+        before = previous.get(name)
+        if not before or not before.get('median'):
+            continue
+        ratio = stats['median'] / before['median']
+        comparison[name] = {
+            'before': before['median'],
+            'after': stats['median'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + threshold,
+        }
+    return comparison
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run(args):
+    provider = FakePriceProvider(years=args.years, latency=args.latency)
+    previous_dir = os.getcwd()
+    previous_store = price_store.PRICE_STORE_DIR
+    with tempfile.TemporaryDirectory() as root:
+        # config_manager and the price store use paths relative to the working directory
+        os.chdir(root)
+        price_store.PRICE_STORE_DIR = os.path.join(root, 'data', 'prices')
+        price_store.set_price_provider(provider)
+        clear_config_caches()
+        get_price_cache().clear()
+        try:
+            fund_ids = write_fund_configs(root, args.funds, args.symbols_per_class, args.glide_points)
+            config = load_config(fund_ids[0])
+            # Fill the price store once so later cases measure warm reads, not the fake provider
+            fetch_histories(fund_symbols(config))
+            cases = function_cases(fund_ids, args.rounds)
+            if not args.skip_routes:
+                cases.update(route_cases(fund_ids[0], fund_symbols(config)[0], args.requests))
+        finally:
+            os.chdir(previous_dir)
+            price_store.PRICE_STORE_DIR = previous_store
+            price_store.set_price_provider(None)
+            clear_config_caches()
+            get_price_cache().clear()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'cases': cases,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark hot paths and routes against synthetic funds.')
+    parser.add_argument('--funds', type=int, default=50, help='synthetic fund configs to create')
+    parser.add_argument('--symbols-per-class', type=int, default=6)
+    parser.add_argument('--glide-points', type=int, default=40)
+    parser.add_argument('--years', type=int, default=20, help='years of daily history per symbol')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the fake provider sleeps per call')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=20, help='requests per route')
+    parser.add_argument('--skip-routes', action='store_true')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare medians against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='median slowdown counted as a regression')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.compare:
+        results['comparison'] = compare(results['cases'], args.compare, args.threshold)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['meta']['commit'] or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+    for name, stats in results['cases'].items():
+        print(f"{name:<70} median {stats['median'] * 1000:9.2f} ms   p95 {stats['p95'] * 1000:9.2f} ms")
+    regressions = [name for name, change in results.get('comparison', {}).items() if change['regression']]
+    for name in regressions:
+        change = results['comparison'][name]
+        print(f"REGRESSION {name}: {change['before'] * 1000:.2f} ms -> {change['after'] * 1000:.2f} ms (x{change['ratio']})")
+    print(f'Results written to {output}')
+    sys.exit(1 if regressions else 0)
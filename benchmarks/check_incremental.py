@@ -0,0 +1,199 @@
+# benchmarks/check_incremental.py
+#
+# Checks that the fast paths give the same results as computing everything from scratch:
+# compiled glide paths against the original interpolation loop, batch rebalancing against
+# calculate_rebalancing, the household against each fund on its own, and the performance
+# cache's append and config-edit paths against a full rebuild:
+#     python -m benchmarks.check_incremental --years 10
+# Exits non-zero if any check fails.
+
+import argparse
+import json
+import sys
+import numpy as np
+from utils.allocation import get_allocations, get_glide_path
+from utils.household import build_household
+from utils.performance import (PERIODS, build_price_matrix, compute_period_returns, get_fund_allocations,
+                               get_fund_performance, weighted_portfolio_series)
+from utils.performance_cache import PerformanceCache
+from utils.rebalancing import calculate_rebalancing, calculate_rebalancing_batch
+from benchmarks.fake_provider import FakePriceProvider
+from benchmarks.synthetic import make_fund_config, fund_symbols
+
+# Float tolerance where the fast path sums in a different order than the reference
+TOLERANCE = 1e-9
+
+def reference_allocations(age, config):
+    # get_allocations as it was before glide paths were compiled
+    glide_path = sorted(config['glide_path'], key=lambda x: x['age'])
+    if not glide_path:
+        return {}
+    if age <= glide_path[0]['age']:
+        return glide_path[0]['allocations']
+    if age >= glide_path[-1]['age']:
+        return glide_path[-1]['allocations']
+    for i in range(len(glide_path) - 1):
+        age1 = glide_path[i]['age']
+        age2 = glide_path[i + 1]['age']
+        if age1 <= age <= age2:
+            allocations1 = glide_path[i]['allocations']
+            allocations2 = glide_path[i + 1]['allocations']
+            ratio = (age - age1) / (age2 - age1)
+            return {key: round(allocations1[key] + ratio * (allocations2[key] - allocations1[key]), 2) for key in allocations1}
+    return {}
+
+def _as_loaded(config):
+    # Synthetic allocations are NumPy floats, which round differently; the app reads plain floats from JSON
+    return json.loads(json.dumps(config))
+
+def _report(cases, mismatches, max_diff=0.0, **extra):
+    return {'cases': cases, 'mismatches': mismatches, 'max_abs_diff': max_diff, **extra}
+
+def check_glide_paths(num_configs):
+    # at() and grid() must match the loop exactly, rounding ties included
+    ages = np.arange(0, 110.5, 0.5)
+    cases = mismatches = 0
+    for seed in range(num_configs):
+        config = _as_loaded(make_fund_config(glide_points=5 + seed % 60, seed=seed))
+        # The second pass edits the same glide path in place, which must not reuse the old compile
+        for edited in (False, True):
+            if edited:
+                entry = config['glide_path'][len(config['glide_path']) // 2]
+                entry['allocations']['us_stock'] += 1
+                entry['allocations']['us_bond'] -= 1
+            grid = get_glide_path(config).grid(ages)
+            for i, age in enumerate(ages):
+                expected = reference_allocations(float(age), config)
+                cases += 1
+                if get_allocations(float(age), config) != expected or any(grid[key][i] != value for key, value in expected.items()):
+                    mismatches += 1
+    return _report(cases, mismatches)
+
+def check_batch_rebalancing(num_accounts, seed=0):
+    # Every account/amount pair of the batch must equal calculate_rebalancing for that pair
+    rng = np.random.default_rng(seed)
+    config = _as_loaded(make_fund_config(symbols_per_class=3, seed=seed))
+    symbols = fund_symbols(config) + ['UNHELD']
+    holdings = rng.uniform(0, 50000, (num_accounts, len(symbols))).round(2)
+    holdings[rng.random(holdings.shape) < 0.2] = 0
+    amounts = [0.0, 100.0, 2500.5, 100000.0]
+    invest, needed, target_symbols, _ = calculate_rebalancing_batch(holdings, symbols, amounts, config)
+    cases = mismatches = 0
+    for account, row in enumerate(holdings):
+        for col, amount in enumerate(amounts):
+            expected_invest, expected_needed, _ = calculate_rebalancing(dict(zip(symbols, row.tolist())), amount, config)
+            cases += 1
+            if (any(invest[account, col, k] != expected_invest[symbol] for k, symbol in enumerate(target_symbols))
+                    or any(needed[account, col, k] != expected_needed[symbol] for k, symbol in enumerate(target_symbols))):
+                mismatches += 1
+    return _report(cases, mismatches)
+
+def _histories(provider, symbols, drop=0):
+    # Full histories, or without their last drop bars
+    histories = {symbol: provider.history(symbol) for symbol in symbols}
+    return {symbol: hist.iloc[:len(hist) - drop].reset_index(drop=True) for symbol, hist in histories.items()}
+
+def _compare_stages(cache, histories, weights):
+    # (mismatches, max abs difference) between the cache's stages and build_price_matrix,
+    # compute_period_returns and weighted_portfolio_series on the same histories
+    mismatches = 0
+    max_diff = 0.0
+    expected_prices = build_price_matrix(histories)
+    prices = cache.price_matrix(histories)
+    if (not prices.index.equals(expected_prices.index) or list(prices.columns) != list(expected_prices.columns)
+            or not np.array_equal(prices.to_numpy(), expected_prices.to_numpy(), equal_nan=True)):
+        mismatches += 1
+    if cache.period_returns(histories, PERIODS) != compute_period_returns(expected_prices, PERIODS):
+        mismatches += 1
+    for fill in ('zero', 'ffill'):
+        series = cache.weighted_series(histories, weights, fill=fill)
+        expected = weighted_portfolio_series(expected_prices, weights, fill=fill)
+        if list(series['date']) != list(expected['date']):
+            mismatches += 1
+            continue
+        diff = float(np.max(np.abs(series['price'].to_numpy(float) - expected['price'].to_numpy(float)), initial=0))
+        max_diff = max(max_diff, diff)
+        if diff > TOLERANCE:
+            mismatches += 1
+    return mismatches, max_diff
+
+def check_performance_cache(provider, config, new_bars=5):
+    # One cache is taken through a cold load, appended bars, a config edit and a rewritten past
+    # bar; after each step every stage must equal a rebuild from the same histories
+    symbols = fund_symbols(config)
+    weights = {symbol: fraction / 100 for symbol, fraction in get_fund_allocations(config).items()}
+    edited = {symbol: weight * (1.5 if i % 2 else 0.5) for i, (symbol, weight) in enumerate(weights.items())}
+    full = _histories(provider, symbols)
+    rewritten = dict(full)
+    rewritten[symbols[0]] = full[symbols[0]].copy()
+    rewritten[symbols[0]].loc[len(full[symbols[0]]) // 2, 'price'] *= 1.01
+    steps = (
+        ('cold', _histories(provider, symbols, drop=new_bars), weights),
+        ('appended bars', full, weights),
+        ('config edit', full, edited),
+        ('rewritten bar', rewritten, edited),
+    )
+    cache = PerformanceCache()
+    cases = mismatches = 0
+    max_diff = 0.0
+    extended = False
+    for label, histories, step_weights in steps:
+        step_mismatches, diff = _compare_stages(cache, histories, step_weights)
+        if label == 'appended bars':
+            # The step only counts if the matrix was extended rather than rebuilt
+            extended = cache._matrices[tuple(symbols)]['parent'] is not None
+        cases += 1
+        mismatches += step_mismatches
+        max_diff = max(max_diff, diff)
+    return _report(cases, mismatches + (not extended), max_diff, extended=extended)
+
+def check_household(provider, num_funds):
+    # Each fund's row of the household must match get_fund_performance and
+    # weighted_portfolio_series for that fund alone
+    configs = {f'fund{i}': _as_loaded(make_fund_config(symbols_per_class=3, seed=i, date_of_birth=1960 + 7 * i))
+               for i in range(num_funds)}
+    histories = _histories(provider, {symbol for config in configs.values() for symbol in fund_symbols(config)})
+    household = build_household(configs, histories=histories)
+    cases = mismatches = 0
+    max_diff = 0.0
+    for fund_id, config in configs.items():
+        symbols = fund_symbols(config)
+        fund_histories = {symbol: histories[symbol] for symbol in symbols}
+        data, _ = get_fund_performance(symbols, config, include_history=False, histories=fund_histories)
+        expected_returns = data['Overall Portfolio']['returns']
+        returns = household['funds'][fund_id]['returns']
+        # Both round to cents after summing in a different order, so a tie may land either way
+        if any(abs(returns[period] - expected_returns[period]) > 0.01 for period in PERIODS
+               if 'N/A' not in (returns[period], expected_returns[period])):
+            mismatches += 1
+        prices = build_price_matrix(fund_histories)
+        weights = {symbol: fraction / 100 for symbol, fraction in get_fund_allocations(config).items()}
+        expected = weighted_portfolio_series(prices, weights)
+        series = household['history'][fund_id].reindex(prices.index).to_numpy()
+        diff = float(np.max(np.abs(series - expected['price'].to_numpy(float)), initial=0))
+        max_diff = max(max_diff, diff)
+        cases += 1
+        if diff > TOLERANCE:
+            mismatches += 1
+    return _report(cases, mismatches, max_diff)
+
+def run(years, num_configs, num_accounts, num_funds):
+    provider = FakePriceProvider(years=years)
+    config = _as_loaded(make_fund_config(symbols_per_class=3))
+    return {
+        'glide_path': check_glide_paths(num_configs),
+        'batch_rebalancing': check_batch_rebalancing(num_accounts),
+        'performance_cache': check_performance_cache(provider, config),
+        'household': check_household(provider, num_funds),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the incremental and batch paths against full recomputes.')
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--configs', type=int, default=50, help='random glide paths to check')
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--funds', type=int, default=5)
+    args = parser.parse_args()
+    results = run(args.years, args.configs, args.accounts, args.funds)
+    print(json.dumps(results, indent=4))
+    sys.exit(1 if any(result['mismatches'] for result in results.values()) else 0)
@@ -0,0 +1,92 @@
+# benchmarks/price_server.py
+#
+# Local stand-in for the upstream price API: serves FakePriceProvider histories over HTTP
+# with a fixed latency per request and counts upstream calls per symbol.
+#     python -m benchmarks.price_server --port 8765 --latency 0.3
+#
+# GET /history/<symbol>?start=YYYY-MM-DD returns 'date,price' CSV; GET /stats returns the call counts.
+
+import argparse
+import io
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from benchmarks.fake_provider import FakePriceProvider
+
+class PriceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # The default backlog of 5 drops connections under load
+
+    def __init__(self, address, latency=0.3, years=20):
+        super().__init__(address, PriceRequestHandler)
+        self.latency = latency
+        self.provider = FakePriceProvider(years=years)
+        self.calls = {}
+        self.calls_lock = threading.Lock()
+        # Full histories are generated once per symbol so the server's own CPU use stays negligible
+        self.histories = {}
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/stats':
+            with self.server.calls_lock:
+                body = json.dumps({'calls': sum(self.server.calls.values()), 'per_symbol': self.server.calls})
+            return self._reply(200, body.encode('utf-8'), 'application/json')
+        if not url.path.startswith('/history/'):
+            return self._reply(404, b'not found', 'text/plain')
+        symbol = urllib.parse.unquote(url.path[len('/history/'):])
+        start = urllib.parse.parse_qs(url.query).get('start', [None])[0]
+        with self.server.calls_lock:
+            self.server.calls[symbol] = self.server.calls.get(symbol, 0) + 1
+        time.sleep(self.server.latency)
+        with self.server.calls_lock:
+            hist = self.server.histories.get(symbol)
+            if hist is None:
+                hist = self.server.histories[symbol] = self.server.provider(symbol)
+        if start is not None:
+            hist = hist[hist['date'] >= start]
+        self._reply(200, hist.to_csv(index=False).encode('utf-8'), 'text/csv')
+
+    def _reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_price_server(port=0, latency=0.3, years=20):
+    # Starts the server on a daemon thread and returns it; server.server_address has the bound port
+    server = PriceServer(('127.0.0.1', port), latency=latency, years=years)
+    threading.Thread(target=server.serve_forever, name='price-server', daemon=True).start()
+    return server
+
+class HttpPriceProvider:
+    # Price provider (see utils.price_store.set_price_provider) that reads from a PriceServer
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def __call__(self, symbol, start=None):
+        url = f'{self.base_url}/history/{urllib.parse.quote(symbol)}'
+        if start is not None:
+            url += f'?start={start}'
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return pd.read_csv(io.BytesIO(response.read()), dtype={'date': str})
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve fake price histories over HTTP.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--years', type=int, default=20)
+    args = parser.parse_args()
+    server = PriceServer(('127.0.0.1', args.port), latency=args.latency, years=args.years)
+    print(f'Serving fake prices on http://127.0.0.1:{args.port}')
+    server.serve_forever()
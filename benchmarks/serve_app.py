@@ -0,0 +1,21 @@
+# benchmarks/serve_app.py
+#
+# The app wired to a stand-in price server for load tests, in both serving modes:
+#     BENCH_ROOT=/tmp/bench PRICE_SERVER_URL=http://127.0.0.1:8765 gunicorn benchmarks.serve_app:app
+#     BENCH_ROOT=/tmp/bench PRICE_SERVER_URL=http://127.0.0.1:8765 uvicorn benchmarks.serve_app:application
+#
+# BENCH_ROOT must contain funds/ (see benchmarks/synthetic.py); prices are stored under it.
+
+import os
+from utils import price_store
+from app import app
+from asgi import application
+from benchmarks.price_server import HttpPriceProvider
+
+__all__ = ['app', 'application']
+
+os.chdir(os.environ['BENCH_ROOT'])
+price_store.PRICE_STORE_DIR = os.path.join(os.environ['BENCH_ROOT'], 'data', 'prices')
+price_store.set_price_provider(HttpPriceProvider(os.environ['PRICE_SERVER_URL']))
+# Every fetch happens on the request path, which is the case the serving modes differ on
+app.config['PRICE_REFRESH_INTERVAL'] = 0
@@ -0,0 +1,62 @@
+# benchmarks/synthetic.py
+#
+# Deterministic fund configs for benchmarks: many funds, many symbols per asset class
+# and long glide paths, in the same shape the app reads from funds/<fund_id>.json.
+
+import json
+import os
+import numpy as np
+
+ASSET_CLASSES = ['us_stock', 'intl_stock', 'us_bond', 'intl_bond', 'short_term_tips']
+
+def make_glide_path(points, start_age=20, end_age=95, seed=0):
+    # Stocks glide down and bonds up, with some noise so every fund is different
+    rng = np.random.default_rng(seed)
+    glide_path = []
+    for age in np.linspace(start_age, end_age, points).round().astype(int):
+        progress = (age - start_age) / max(end_age - start_age, 1)
+        stocks = 90 - 60 * progress + rng.uniform(-3, 3)
+        tips = 10 * progress
+        bonds = 100 - stocks - tips
+        allocations = {
+            'us_stock': round(stocks * 0.6, 2),
+            'intl_stock': round(stocks * 0.4, 2),
+            'us_bond': round(bonds * 0.7, 2),
+            'intl_bond': round(bonds * 0.3, 2),
+        }
+        allocations['short_term_tips'] = round(100 - sum(allocations.values()), 2)
+        glide_path.append({'age': int(age), 'allocations': allocations})
+    # Ages must be unique; rounding can collapse neighbours on very long paths
+    return list({entry['age']: entry for entry in glide_path}.values())
+
+def make_fund_config(symbols_per_class=3, glide_points=20, seed=0, date_of_birth=1980, fund_name=None, symbol_prefix='S'):
+    funds = {}
+    for class_index, asset_class in enumerate(ASSET_CLASSES):
+        funds[asset_class] = [
+            {'symbol': f'{symbol_prefix}{class_index}{i:03d}', 'percentage': round(100 / symbols_per_class, 4)}
+            for i in range(symbols_per_class)
+        ]
+    return {
+        'fund_name': fund_name or f'Synthetic Fund {seed}',
+        'date_of_birth': date_of_birth,
+        'glide_path': make_glide_path(glide_points, seed=seed),
+        'funds': funds,
+    }
+
+def write_fund_configs(root, num_funds, symbols_per_class=3, glide_points=20, distinct_symbols=False):
+    # Writes root/funds/bench<i>.json and returns the fund ids. Funds share one symbol universe
+    # unless distinct_symbols is set
+    funds_dir = os.path.join(root, 'funds')
+    os.makedirs(funds_dir, exist_ok=True)
+    fund_ids = []
+    for i in range(num_funds):
+        fund_id = f'bench{i}'
+        config = make_fund_config(symbols_per_class, glide_points, seed=i, date_of_birth=1960 + i % 40,
+                                  symbol_prefix=f'F{i}S' if distinct_symbols else 'S')
+        with open(os.path.join(funds_dir, f'{fund_id}.json'), 'w') as f:
+            json.dump(config, f, indent=4)
+        fund_ids.append(fund_id)
+    return fund_ids
+
+def fund_symbols(config):
+    return [fund_info['symbol'] for funds in config['funds'].values() for fund_info in funds]
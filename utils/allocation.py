@@ -1,59 +1,91 @@
-from utils.config_manager import load_config
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import io
-import base64
+import bisect
+import numpy as np
 
-def get_allocations(age, config):
-    glide_path = sorted(config['glide_path'], key=lambda x: x['age'])
-    if not glide_path:
-        return {}
-    # If age is before the first glide path entry
-    if age <= glide_path[0]['age']:
-        return glide_path[0]['allocations']
-    # If age is after the last glide path entry
-    if age >= glide_path[-1]['age']:
-        return glide_path[-1]['allocations']
-    # Interpolate between glide path entries
-    for i in range(len(glide_path) - 1):
-        age1 = glide_path[i]['age']
-        age2 = glide_path[i + 1]['age']
-        if age1 <= age <= age2:
-            allocations1 = glide_path[i]['allocations']
-            allocations2 = glide_path[i + 1]['allocations']
-            ratio = (age - age1) / (age2 - age1)
-            interpolated_allocations = {}
-            for key in allocations1.keys():
-                value = allocations1[key] + ratio * (allocations2[key] - allocations1[key])
-                interpolated_allocations[key] = round(value, 2)
-            return interpolated_allocations
-    return {}
+_GLIDE_PATH_CACHE_SIZE = 128
+_glide_path_cache = {}
+# id(config['glide_path']) -> (that list, (age, allocations) copies of its entries, GlidePath).
+# The list is kept so its id cannot be reused, and the copies catch edits made in place
+_glide_path_by_list = {}
+
+class GlidePath:
+    # Glide path sorted once into arrays so allocations can be looked up by bisection
+    def __init__(self, glide_path):
+        self.entries = [{'age': entry['age'], 'allocations': dict(entry['allocations'])}
+                        for entry in sorted(glide_path, key=lambda x: x['age'])]
+        self.asset_classes = list(self.entries[0]['allocations'].keys()) if self.entries else []
+        self.age_list = [entry['age'] for entry in self.entries]
+        self.ages = np.array(self.age_list, dtype=float)
+        self.allocations = np.array(
+            [[entry['allocations'].get(key, 0) for key in self.asset_classes] for entry in self.entries],
+            dtype=float
+        ).reshape(len(self.entries), len(self.asset_classes))
+
+    def at(self, age):
+        if not self.entries:
+            return {}
+        # If age is before the first glide path entry
+        if age <= self.age_list[0]:
+            return dict(self.entries[0]['allocations'])
+        # If age is after the last glide path entry
+        if age >= self.age_list[-1]:
+            return dict(self.entries[-1]['allocations'])
+        # Interpolate between the bracketing glide path entries
+        i = bisect.bisect_left(self.age_list, age)
+        age1 = self.age_list[i - 1]
+        age2 = self.age_list[i]
+        allocations1 = self.entries[i - 1]['allocations']
+        allocations2 = self.entries[i]['allocations']
+        ratio = (age - age1) / (age2 - age1)
+        interpolated_allocations = {}
+        for key in allocations1.keys():
+            value = allocations1[key] + ratio * (allocations2[key] - allocations1[key])
+            interpolated_allocations[key] = round(value, 2)
+        return interpolated_allocations
 
-def plot_allocations(config=None):
-    if config is None:
-        config = load_config()
-    ages = list(range(1, 101))
-    allocation_keys = config['glide_path'][0]['allocations'].keys()
-    allocations_over_age = {key: [] for key in allocation_keys}
-    for age in ages:
-        allocations = get_allocations(age, config)
-        for key in allocations_over_age:
-            allocations_over_age[key].append(allocations.get(key, 0))
+    def grid(self, ages):
+        # Allocations for every age at once: {asset_class: array aligned with ages}
+        ages = np.asarray(ages, dtype=float)
+        if not self.entries:
+            return {}
+        idx = np.clip(np.searchsorted(self.ages, ages, side='left'), 1, max(len(self.ages) - 1, 1))
+        lower = self.allocations[idx - 1]
+        upper = self.allocations[np.minimum(idx, len(self.ages) - 1)]
+        age1 = self.ages[idx - 1]
+        age2 = self.ages[np.minimum(idx, len(self.ages) - 1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = (ages - age1) / (age2 - age1)
+            raw = lower + ratio[:, None] * (upper - lower)
+            values = np.round(raw, 2)
+            # np.round scales by 100 first, which can land on the other side of a .xx5 tie than
+            # Python's round; redo those few values so the grid matches get_allocations exactly
+            scaled = raw * 100
+            ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        for row, col in zip(*np.nonzero(ties)):
+            values[row, col] = round(float(raw[row, col]), 2)
+        values[ages <= self.ages[0]] = self.allocations[0]
+        values[ages >= self.ages[-1]] = self.allocations[-1]
+        return {key: values[:, col] for col, key in enumerate(self.asset_classes)}
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.stackplot(ages, allocations_over_age.values(), labels=allocations_over_age.keys())
-    ax.legend(loc='upper right')
-    ax.set_xlabel('Age')
-    ax.set_ylabel('Allocation Percentage')
-    ax.set_title('Asset Allocation Over Age')
+def _glide_path_key(glide_path):
+    return tuple((entry['age'], tuple(entry['allocations'].items())) for entry in glide_path)
 
-    # Save the plot to a bytes buffer and encode it
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    image_png = buf.getvalue()
-    buf.close()
-    plt.close(fig)
-    graph = base64.b64encode(image_png).decode('utf-8')
-    return graph
+def get_glide_path(config):
+    entries = config['glide_path']
+    current = [(entry['age'], entry['allocations']) for entry in entries]
+    cached = _glide_path_by_list.get(id(entries))
+    # Comparing the entries is much cheaper than building the content key
+    if cached is not None and cached[0] is entries and cached[1] == current:
+        return cached[2]
+    key = _glide_path_key(entries)
+    glide_path = _glide_path_cache.get(key)
+    if glide_path is None:
+        if len(_glide_path_cache) >= _GLIDE_PATH_CACHE_SIZE:
+            _glide_path_cache.clear()
+        glide_path = _glide_path_cache[key] = GlidePath(entries)
+    if len(_glide_path_by_list) >= _GLIDE_PATH_CACHE_SIZE:
+        _glide_path_by_list.clear()
+    _glide_path_by_list[id(entries)] = (entries, [(age, dict(allocations)) for age, allocations in current], glide_path)
+    return glide_path
+
+def get_allocations(age, config):
+    return get_glide_path(config).at(age)
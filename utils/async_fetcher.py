@@ -0,0 +1,70 @@
+# utils/async_fetcher.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.fetcher import FETCH_TIMEOUT, FETCH_RETRIES, RETRY_BACKOFF, fetch_coalesced
+from utils.metrics import increment
+from utils.price_store import get_price_arrays
+
+ASYNC_FETCH_WORKERS = 32
+
+# (event loop, fetch, symbol) -> task fetching it; concurrent requests await the same task
+_in_flight = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    # yfinance and SQLite are blocking, so each fetch still runs on a thread of its own pool
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ASYNC_FETCH_WORKERS, thread_name_prefix='async-fetch')
+        return _executor
+
+def _run_attempt(loop, started, symbol, fetch):
+    loop.call_soon_threadsafe(started.set)
+    return fetch_coalesced(symbol, fetch)
+
+async def _fetch_with_retries(symbol, fetch, timeout, retries, backoff):
+    loop = asyncio.get_running_loop()
+    for attempt in range(retries + 1):
+        started = asyncio.Event()
+        future = loop.run_in_executor(_get_executor(), _run_attempt, loop, started, symbol, fetch)
+        try:
+            # Like fetch_histories, the timeout covers the attempt itself, not time queued for a thread
+            started_waiter = loop.create_task(started.wait())
+            await asyncio.wait([future, started_waiter], return_when=asyncio.FIRST_COMPLETED)
+            started_waiter.cancel()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out fetching {symbol} after {timeout} seconds")
+        except Exception:
+            increment('symbol_fetch_errors_total', {'symbol': symbol})
+            if attempt == retries:
+                raise
+        await asyncio.sleep(backoff * (2 ** attempt))
+
+def fetch_symbol_async(symbol, fetch=None, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=RETRY_BACKOFF):
+    # Task for the symbol's fetch, joining one already in flight on this event loop
+    fetch = fetch or get_price_arrays
+    loop = asyncio.get_running_loop()
+    key = (loop, fetch, symbol)
+    task = _in_flight.get(key)
+    if task is None:
+        task = loop.create_task(_fetch_with_retries(symbol, fetch, timeout, retries, backoff))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        increment('fetch_coalesced_total')
+    return task
+
+async def fetch_histories_async(symbols, fetch=None, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES,
+                                backoff=RETRY_BACKOFF):
+    # Awaitable counterpart of fetch_histories: {symbol: result or the Exception that ended its fetch}.
+    # The default fetch returns the price cache's (days, prices) arrays.
+    unique_symbols = list(dict.fromkeys(symbols))
+    tasks = [fetch_symbol_async(symbol, fetch, timeout, retries, backoff) for symbol in unique_symbols]
+    # Shielded so a disconnecting client does not cancel a fetch other requests are waiting on
+    results = await asyncio.gather(*(asyncio.shield(task) for task in tasks), return_exceptions=True)
+    return dict(zip(unique_symbols, results))
@@ -0,0 +1,133 @@
+# utils/backtest.py
+
+import numpy as np
+import pandas as pd
+from utils.allocation import get_glide_path
+
+FREQUENCIES = ('monthly', 'quarterly', 'threshold')
+TRADING_DAYS_PER_YEAR = 252
+
+def _target_weight_matrix(config, symbols, dates):
+    # dates x symbols matrix of glide path weights (fractions) for the investor's age on each date
+    glide_path = get_glide_path(config)
+    years = dates.year.to_numpy()
+    unique_years, year_index = np.unique(years, return_inverse=True)
+    allocations = glide_path.grid(unique_years - config.get('date_of_birth', 0))
+    weights = np.zeros((len(unique_years), len(symbols)))
+    column_of = {symbol: col for col, symbol in enumerate(symbols)}
+    for asset_class, funds in config['funds'].items():
+        if asset_class not in allocations:
+            continue
+        for fund_info in funds:
+            col = column_of.get(fund_info['symbol'])
+            if col is not None:
+                weights[:, col] = allocations[asset_class] / 100 * fund_info['percentage'] / 100
+    return weights[year_index]
+
+def _period_starts(dates, frequency):
+    # Row indices of the first trading day of every month or quarter
+    periods = dates.to_period('Q' if frequency == 'quarterly' else 'M').asi8
+    return np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+
+def _rebalance_shares(value, target_row, price_row):
+    available = ~np.isnan(price_row)
+    if not available.any():
+        return np.zeros(len(price_row))
+    weights = np.where(available, target_row, 0.0)
+    if weights.sum() <= 0:
+        weights = available / max(available.sum(), 1)
+    weights = weights / weights.sum()
+    return np.where(available, value * weights / np.where(available, price_row, 1.0), 0.0)
+
+def run_backtest(prices, config, initial_amount=10000.0, contribution=0.0, frequency='monthly',
+                 threshold=5.0, start=None, end=None):
+    # prices: date x symbol matrix from build_price_matrix. Contributions are added on the first
+    # trading day of each month; frequency controls when the portfolio is reset to the glide path.
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unsupported frequency '{frequency}', expected one of {', '.join(FREQUENCIES)}")
+    if not 0 <= threshold < float('inf'):
+        raise ValueError('threshold must be a non-negative number')
+    prices = prices.ffill()
+    if start:
+        prices = prices[prices.index >= pd.Timestamp(start)]
+    if end:
+        prices = prices[prices.index <= pd.Timestamp(end)]
+    prices = prices[prices.notna().any(axis=1).to_numpy()]
+    if prices.empty:
+        raise ValueError('No price history is available for the selected date range.')
+    dates = prices.index
+    symbols = list(prices.columns)
+    price_matrix = prices.to_numpy(dtype=float)
+    filled_prices = np.nan_to_num(price_matrix)
+    targets = _target_weight_matrix(config, symbols, dates)
+    n_dates = len(dates)
+
+    contribution_days = np.zeros(n_dates, dtype=bool)
+    contribution_days[_period_starts(dates, 'monthly')] = True
+    contribution_days[0] = False
+    scheduled = np.zeros(n_dates, dtype=bool)
+    if frequency != 'threshold':
+        scheduled[_period_starts(dates, frequency)] = True
+
+    values = np.empty(n_dates)
+    contributions = np.where(contribution_days, contribution, 0.0)
+    contributions[0] = initial_amount
+    shares = _rebalance_shares(initial_amount, targets[0], price_matrix[0])
+    rebalance_dates = [dates[0]]
+    event_days = np.flatnonzero(contribution_days | scheduled)
+    segment_start = 0
+    # Shares only change on event days, so every stretch between them is one matrix-vector product
+    for next_event in list(event_days[event_days > 0]) + [n_dates]:
+        while True:
+            segment_values = filled_prices[segment_start:next_event] @ shares
+            values[segment_start:next_event] = segment_values
+            if frequency != 'threshold' or next_event - segment_start <= 1:
+                break
+            with np.errstate(divide='ignore', invalid='ignore'):
+                drift = np.abs(filled_prices[segment_start:next_event] * shares / segment_values[:, None]
+                               - targets[segment_start:next_event]).max(axis=1) * 100
+            breaches = np.flatnonzero(drift[1:] > threshold)
+            if len(breaches) == 0:
+                break
+            day = segment_start + 1 + breaches[0]
+            shares = _rebalance_shares(filled_prices[day] @ shares, targets[day], price_matrix[day])
+            rebalance_dates.append(dates[day])
+            segment_start = day
+        if next_event == n_dates:
+            break
+        value = filled_prices[next_event] @ shares + contributions[next_event]
+        if scheduled[next_event]:
+            shares = _rebalance_shares(value, targets[next_event], price_matrix[next_event])
+            rebalance_dates.append(dates[next_event])
+        else:
+            # New money is split by the target weights without trading existing holdings
+            shares = shares + _rebalance_shares(contributions[next_event], targets[next_event], price_matrix[next_event])
+        segment_start = next_event
+
+    # Time-weighted daily returns strip out the effect of contributions; days that start with
+    # nothing invested have no return
+    previous = np.r_[0.0, values[:-1]] + contributions
+    daily_returns = np.divide(values, previous, out=np.ones(n_dates), where=previous > 0) - 1
+    daily_returns[0] = 0.0
+    volatility = np.std(daily_returns[1:]) * np.sqrt(TRADING_DAYS_PER_YEAR) if n_dates > 2 else 0.0
+    # Without any money put in there is no return to report
+    invested = contributions.sum() > 0
+    growth = np.cumprod(1 + daily_returns)
+    years = max((dates[-1] - dates[0]).days / 365.25, 1 / 365.25)
+    drawdowns = growth / np.maximum.accumulate(growth) - 1
+    summary = {
+        'start_date': dates[0].strftime('%Y-%m-%d'),
+        'end_date': dates[-1].strftime('%Y-%m-%d'),
+        'final_value': round(float(values[-1]), 2),
+        'total_contributions': round(float(contributions.sum()), 2),
+        'annualized_return': round(float(growth[-1] ** (1 / years) - 1) * 100, 2) if invested else None,
+        'annualized_volatility': round(float(volatility) * 100, 2) if invested else None,
+        'max_drawdown': round(float(drawdowns.min()) * 100, 2) if invested else None,
+        'rebalance_count': len(rebalance_dates),
+    }
+    history = pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'value': values,
+        'invested': np.cumsum(contributions),
+    })
+    return history, summary
@@ -0,0 +1,284 @@
+# utils/config_import.py
+#
+# Validates, and optionally imports, many fund configs at once from a directory, a zip archive
+# or single JSON files (such as legacy/config_master.json):
+#     python -m utils.config_import path/to/configs.zip --output report.json
+#     python -m utils.config_import path/to/configs/ --import --overwrite
+#
+# Files are parsed and checked on a process pool; symbols are then checked once each against
+# the local price store (warnings, or errors with --require-prices), and imported configs are written before the fund index is updated once.
+
+import argparse
+import datetime
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from utils.config_manager import get_available_funds, save_configs
+from utils.price_store import has_price_history
+
+# Same tolerance edit_config allows on totals
+TOLERANCE = 0.01
+# Larger files are rejected unread. The file count and total size are checked before anything is
+# read or decompressed, which bounds what an upload or a zip archive can expand to
+MAX_CONFIG_BYTES = 1024 * 1024
+MAX_CONFIG_FILES = 10000
+MAX_TOTAL_BYTES = 64 * 1024 * 1024
+# Below this many files the pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+FUND_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9._-]*$')
+
+def _issue(check, message):
+    return {'check': check, 'message': message}
+
+def _check_limits(count, size):
+    # count files of size bytes in total (files over MAX_CONFIG_BYTES are not read and not counted)
+    if count > MAX_CONFIG_FILES:
+        raise ValueError(f'Found {count} configs, at most {MAX_CONFIG_FILES} can be processed at once.')
+    if size > MAX_TOTAL_BYTES:
+        raise ValueError(f'The configs add up to {size} bytes, at most {MAX_TOTAL_BYTES} can be processed at once.')
+
+def _read_file(path):
+    # File contents, or None if it is too large to be a config
+    if os.path.getsize(path) > MAX_CONFIG_BYTES:
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _read_directory(path):
+    paths = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(names):
+            if name.endswith('.json') and not name.startswith('.'):
+                paths.append(os.path.join(root, name))
+    sizes = [os.path.getsize(file_path) for file_path in paths]
+    _check_limits(len(paths), sum(size for size in sizes if size <= MAX_CONFIG_BYTES))
+    return [(os.path.relpath(file_path, path), _read_file(file_path)) for file_path in paths]
+
+def read_archive(fileobj, count=0, size=0):
+    # [(member name, bytes or None if too large)] for every .json member of a zip archive.
+    # count and size are configs already accepted alongside it; the limits are checked against the
+    # sizes in the archive's directory, which zipfile enforces while decompressing
+    with zipfile.ZipFile(fileobj) as archive:
+        members = []
+        for info in archive.infolist():
+            base = os.path.basename(info.filename)
+            if info.is_dir() or not base.endswith('.json') or base.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            members.append(info)
+        _check_limits(count + len(members), size + sum(info.file_size for info in members if info.file_size <= MAX_CONFIG_BYTES))
+        return [(info.filename, archive.read(info) if info.file_size <= MAX_CONFIG_BYTES else None) for info in members]
+
+def read_source(path):
+    # [(source name, bytes or None)] from a directory, a zip archive or one JSON file
+    if os.path.isdir(path):
+        files = _read_directory(path)
+    elif zipfile.is_zipfile(path):
+        with open(path, 'rb') as f:
+            files = read_archive(f)
+    elif os.path.isfile(path):
+        files = [(os.path.basename(path), _read_file(path))]
+    else:
+        raise FileNotFoundError(f"No config directory, archive or file at '{path}'.")
+    return files
+
+def read_uploads(uploads):
+    # [(source name, bytes or None)] from uploaded (filename, bytes) pairs, each a .zip or a .json
+    files = []
+    size = 0
+    for filename, data in uploads:
+        if filename.lower().endswith('.zip'):
+            try:
+                members = read_archive(io.BytesIO(data), len(files), size)
+            except zipfile.BadZipFile:
+                raise ValueError(f"'{filename}' is not a valid zip archive.")
+        elif filename.lower().endswith('.json'):
+            members = [(filename, data if len(data) <= MAX_CONFIG_BYTES else None)]
+        else:
+            raise ValueError(f"'{filename}' is not a .json config or a .zip archive.")
+        files.extend(members)
+        size += sum(len(member) for _, member in members if member is not None)
+        _check_limits(len(files), size)
+    return files
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_config(config):
+    # (errors, warnings, symbols) for one parsed config, with the same rules edit_config enforces
+    errors = []
+    warnings = []
+    if not isinstance(config, dict):
+        return [_issue('structure', 'The config must be a JSON object.')], warnings, []
+    if not isinstance(config.get('fund_name', ''), str):
+        errors.append(_issue('structure', "'fund_name' must be a string."))
+    if not isinstance(config.get('date_of_birth'), int) or isinstance(config.get('date_of_birth'), bool):
+        errors.append(_issue('structure', "'date_of_birth' must be a year."))
+
+    symbols = []
+    funds = config.get('funds')
+    if not isinstance(funds, dict):
+        errors.append(_issue('structure', "'funds' must map each asset class to a list of funds."))
+        funds = {}
+    for asset_class, fund_list in funds.items():
+        if not isinstance(fund_list, list):
+            errors.append(_issue('structure', f"Funds for '{asset_class}' must be a list."))
+            continue
+        total_percentage = 0
+        for fund_info in fund_list:
+            if (not isinstance(fund_info, dict) or not isinstance(fund_info.get('symbol'), str)
+                    or not fund_info['symbol'].strip() or not _is_number(fund_info.get('percentage'))):
+                errors.append(_issue('structure', f"Every fund in '{asset_class}' needs a symbol and a percentage."))
+                continue
+            symbols.append(fund_info['symbol'])
+            total_percentage += fund_info['percentage']
+        if abs(total_percentage - 100) > TOLERANCE:
+            errors.append(_issue('fund_percentages',
+                                 f"The total percentage for '{asset_class}' must equal 100%. Currently, it is {round(total_percentage, 4)}%."))
+
+    glide_path = config.get('glide_path')
+    if not isinstance(glide_path, list) or not glide_path:
+        errors.append(_issue('structure', "'glide_path' must be a non-empty list of age entries."))
+        glide_path = []
+    asset_classes = None
+    allocated = set()
+    previous_age = None
+    for entry in glide_path:
+        if not isinstance(entry, dict) or not _is_number(entry.get('age')) or not isinstance(entry.get('allocations'), dict):
+            errors.append(_issue('structure', 'Every glide path entry needs an age and allocations.'))
+            continue
+        age = entry['age']
+        allocations = entry['allocations']
+        if previous_age is not None and age <= previous_age:
+            errors.append(_issue('glide_path_ages', f'Glide path ages must increase. Age {age} follows age {previous_age}.'))
+        previous_age = age
+        if not all(_is_number(value) for value in allocations.values()):
+            errors.append(_issue('structure', f'Allocations at age {age} must be numbers.'))
+            continue
+        total_alloc = sum(allocations.values())
+        if abs(total_alloc - 100) > TOLERANCE:
+            errors.append(_issue('glide_path_totals',
+                                 f'The total allocation percentages at age {age} must equal 100%. Currently, it is {round(total_alloc, 4)}%.'))
+        # Interpolation pairs up the asset classes of neighbouring entries
+        if asset_classes is None:
+            asset_classes = set(allocations)
+        elif set(allocations) != asset_classes:
+            errors.append(_issue('glide_path_asset_classes',
+                                 f"Allocations at age {age} list {', '.join(sorted(allocations))}, expected {', '.join(sorted(asset_classes))}."))
+        allocated.update(asset_class for asset_class, value in allocations.items() if value)
+    for asset_class in sorted(allocated):
+        if not funds.get(asset_class):
+            errors.append(_issue('asset_classes', f"'{asset_class}' has a glide path allocation but no funds."))
+    for asset_class in funds:
+        if asset_classes is not None and asset_class not in asset_classes:
+            warnings.append(_issue('asset_classes', f"'{asset_class}' has funds but no glide path allocation."))
+    return errors, warnings, list(dict.fromkeys(symbols))
+
+def _check_file(task):
+    source, data = task
+    fund_id = os.path.splitext(os.path.basename(source))[0].replace(' ', '_')
+    result = {'fund_id': fund_id, 'source': source, 'errors': [], 'warnings': [], 'symbols': [], 'config': None}
+    if not FUND_ID_PATTERN.match(fund_id):
+        result['errors'].append(_issue('fund_id', f"'{fund_id}' cannot be used as a fund id."))
+    if data is None:
+        result['errors'].append(_issue('structure', f'The file is larger than {MAX_CONFIG_BYTES} bytes.'))
+        return result
+    try:
+        config = json.loads(data)
+    except ValueError as e:
+        result['errors'].append(_issue('json', f'Invalid JSON: {e}'))
+        return result
+    errors, warnings, symbols = validate_config(config)
+    result['errors'].extend(errors)
+    result['warnings'] = warnings
+    result['symbols'] = symbols
+    result['config'] = config
+    return result
+
+def _check_files(tasks):
+    return [_check_file(task) for task in tasks]
+
+def check_files(files, workers=None):
+    # Parses and validates every (source, bytes) pair, in chunks across worker processes
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(files) >= PARALLEL_MIN_FILES:
+        chunk_size = -(-len(files) // (workers * 4))
+        chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            return [result for chunk in executor.map(_check_files, chunks) for result in chunk]
+    return _check_files(files)
+
+def import_configs(files, apply=False, overwrite=False, workers=None, require_prices=False):
+    # Report for every file; with apply, the valid configs are written to funds/ in one batch.
+    # Symbols without stored prices are warnings unless require_prices is set, since a new symbol
+    # is only fetched once a config that holds it is in funds/
+    results = check_files(files, workers)
+    symbols = list(dict.fromkeys(symbol for result in results for symbol in result['symbols']))
+    unresolved = {symbol for symbol in symbols if not has_price_history(symbol)}
+    existing = {fund['id'] for fund in get_available_funds()}
+    seen = {}
+    for result in results:
+        fund_id = result['fund_id']
+        if fund_id in seen:
+            result['errors'].append(_issue('fund_id', f"Fund id '{fund_id}' is also used by {seen[fund_id]}."))
+        seen.setdefault(fund_id, result['source'])
+        for symbol in result['symbols']:
+            if symbol in unresolved:
+                issues = result['errors'] if require_prices else result['warnings']
+                issues.append(_issue('symbols', f"Symbol '{symbol}' has no history in the local price store."))
+        if fund_id in existing and not overwrite:
+            result['errors'].append(_issue('fund_id', f"A fund with the id '{fund_id}' already exists."))
+    valid = {result['fund_id']: result['config'] for result in results if not result['errors']}
+    if apply and valid:
+        save_configs(valid)
+    return {
+        'mode': 'import' if apply else 'validate',
+        'checked_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'summary': {
+            'files': len(results),
+            'valid': len(valid),
+            'invalid': len(results) - len(valid),
+            'imported': len(valid) if apply else 0,
+            'symbols': len(symbols),
+            'unresolved_symbols': sorted(unresolved),
+        },
+        'configs': [
+            {
+                'fund_id': result['fund_id'],
+                'source': result['source'],
+                'valid': not result['errors'],
+                'imported': apply and not result['errors'],
+                'errors': result['errors'],
+                'warnings': result['warnings'],
+            }
+            for result in results
+        ],
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validate or import a directory, zip archive or JSON file of fund configs.')
+    parser.add_argument('source', help='directory, .zip archive or single .json config')
+    parser.add_argument('--import', dest='apply', action='store_true', help='write the valid configs to funds/')
+    parser.add_argument('--overwrite', action='store_true', help='replace funds that already exist')
+    parser.add_argument('--require-prices', action='store_true',
+                        help='treat symbols without history in the local price store as errors')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = import_configs(read_source(args.source), apply=args.apply, overwrite=args.overwrite,
+                            workers=args.workers, require_prices=args.require_prices)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        summary = report['summary']
+        print(f"{summary['files']} configs: {summary['valid']} valid, {summary['invalid']} invalid, "
+              f"{summary['imported']} imported. Report written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+    sys.exit(1 if report['summary']['invalid'] else 0)
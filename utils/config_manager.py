@@ -1,33 +1,95 @@
 # utils/config_manager.py
 
+import copy
 import json
 import os
+import tempfile
+import threading
+from utils.metrics import cache_result
+
+# Parsed configs and fund names, keyed by path and invalidated when the file's mtime or size changes
+_config_cache = {}
+_fund_index = {}
+_cache_lock = threading.Lock()
+
+def _file_signature(stat_result):
+    return (stat_result.st_mtime_ns, stat_result.st_size)
 
 def load_config(fund_id):
     config_path = os.path.join('funds', f'{fund_id}.json')
-    if not os.path.exists(config_path):
+    try:
+        signature = _file_signature(os.stat(config_path))
+    except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file for fund '{fund_id}' not found.")
-    with open(config_path, 'r') as f:
-        config = json.load(f)
-    return config
+    cached = _config_cache.get(config_path)
+    hit = cached is not None and cached[0] == signature
+    cache_result('config', hit)
+    if not hit:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        cached = (signature, config)
+        with _cache_lock:
+            _config_cache[config_path] = cached
+    # Callers are free to mutate the returned config
+    return copy.deepcopy(cached[1])
+
+def _write_config(config, fund_id):
+    config_path = os.path.join('funds', f'{fund_id}.json')
+    # Write to a temporary file and rename it so readers never see a half-written config
+    fd, temp_path = tempfile.mkstemp(dir='funds', prefix=f'.{fund_id}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, config_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return config_path, _file_signature(os.stat(config_path))
 
 def save_config(config, fund_id):
+    save_configs({fund_id: config})
+
+def save_configs(configs):
+    # {fund_id: config}; every file is written before the config cache and fund index are updated, once
     os.makedirs('funds', exist_ok=True)
-    config_path = os.path.join('funds', f'{fund_id}.json')
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=4)
+    written = {fund_id: _write_config(config, fund_id) for fund_id, config in configs.items()}
+    with _cache_lock:
+        for fund_id, (config_path, signature) in written.items():
+            config = configs[fund_id]
+            _config_cache[config_path] = (signature, copy.deepcopy(config))
+            _fund_index[fund_id] = (signature, config.get('fund_name', fund_id))
 
 def get_available_funds():
     funds = []
     if not os.path.exists('funds'):
         return funds
-    for filename in os.listdir('funds'):
-        if filename.endswith('.json'):
-            fund_id = filename[:-5]  # Remove '.json' extension
+    seen = set()
+    with os.scandir('funds') as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json'):
+                continue
+            fund_id = entry.name[:-5]  # Remove '.json' extension
+            seen.add(fund_id)
             try:
-                config = load_config(fund_id)
-                fund_name = config.get('fund_name', fund_id)
-                funds.append({'id': fund_id, 'name': fund_name})
+                signature = _file_signature(entry.stat())
+                cached = _fund_index.get(fund_id)
+                hit = cached is not None and cached[0] == signature
+                cache_result('fund_index', hit)
+                if not hit:
+                    config = load_config(fund_id)
+                    cached = (signature, config.get('fund_name', fund_id))
+                    with _cache_lock:
+                        _fund_index[fund_id] = cached
+                funds.append({'id': fund_id, 'name': cached[1]})
             except Exception as e:
                 continue  # Skip if there's an error loading the config
+    with _cache_lock:
+        for fund_id in list(_fund_index):
+            if fund_id not in seen:
+                del _fund_index[fund_id]
+                _config_cache.pop(os.path.join('funds', f'{fund_id}.json'), None)
     return funds
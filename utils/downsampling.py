@@ -0,0 +1,62 @@
+# utils/downsampling.py
+
+import numpy as np
+import pandas as pd
+
+RESAMPLE_FREQUENCIES = {'weekly': 'W-FRI', 'monthly': 'ME'}
+# LTTB always keeps the first and last points, so fewer than this cannot be downsampled
+MIN_POINTS = 3
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the points that preserve the visual shape of a line
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    # Bucket edges over the interior points, first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(areas.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+def parse_points(value):
+    # The 'points' query argument: None when not given, otherwise a whole number of at least MIN_POINTS
+    if value is None or value == '':
+        return None
+    try:
+        points = int(value)
+    except ValueError:
+        raise ValueError(f"points must be a whole number, got '{value}'")
+    if points < MIN_POINTS:
+        raise ValueError(f'points must be at least {MIN_POINTS}')
+    return points
+
+def downsample_history(hist, points=None, frequency=None):
+    # hist: DataFrame with 'date' (YYYY-MM-DD) and 'price'
+    if points is not None and points < MIN_POINTS:
+        raise ValueError(f'points must be at least {MIN_POINTS}')
+    if hist.empty:
+        return hist
+    if frequency is not None:
+        if frequency not in RESAMPLE_FREQUENCIES:
+            raise ValueError(f"Unsupported frequency '{frequency}', expected one of {', '.join(RESAMPLE_FREQUENCIES)}")
+        series = pd.Series(hist['price'].to_numpy(), index=pd.to_datetime(hist['date']))
+        series = series.resample(RESAMPLE_FREQUENCIES[frequency]).last().dropna()
+        hist = pd.DataFrame({'date': series.index.strftime('%Y-%m-%d'), 'price': series.to_numpy()})
+    if points is not None and len(hist) > points:
+        x = pd.to_datetime(hist['date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        hist = hist.iloc[lttb_indices(x, hist['price'].to_numpy(), points)]
+    return hist.reset_index(drop=True)
@@ -0,0 +1,96 @@
+# utils/export.py
+
+import csv
+import io
+import numpy as np
+from utils.allocation import get_glide_path
+from utils.price_cache import days_to_dates
+
+EXPORT_FORMATS = ('csv', 'parquet')
+BATCH_ROWS = 5000  # rows per CSV chunk and per Parquet row group
+
+# Column types: 'string', 'float64', 'int64', or 'date' (int32 days since 1970-01-01 in batches)
+HISTORY_COLUMNS = [('symbol', 'string'), ('date', 'date'), ('price', 'float64')]
+PERFORMANCE_FIELDS = ['current_price', 'daily_change', 'daily_change_percent', 'allocation_percentage']
+
+def history_batches(series, start_day=None, end_day=None):
+    # series: iterable of (symbol, days, prices) -> column batches in HISTORY_COLUMNS order
+    for symbol, days, prices in series:
+        first = 0 if start_day is None else int(np.searchsorted(days, start_day, side='left'))
+        last = len(days) if end_day is None else int(np.searchsorted(days, end_day, side='right'))
+        for offset in range(first, last, BATCH_ROWS):
+            stop = min(offset + BATCH_ROWS, last)
+            yield [[symbol] * (stop - offset), days[offset:stop], prices[offset:stop]]
+
+def performance_table(performance_data, periods):
+    # Columns and a single batch for the performance table; 'N/A' becomes an empty value
+    columns = [('symbol', 'string')] + [(field, 'float64') for field in PERFORMANCE_FIELDS]
+    columns += [(f'return_{period}', 'float64') for period in periods] + [('error', 'string')]
+    rows = []
+    for symbol, fund_data in performance_data.items():
+        returns = fund_data.get('returns', {})
+        values = [fund_data.get(field) for field in PERFORMANCE_FIELDS] + [returns.get(period) for period in periods]
+        rows.append([symbol] + [value if isinstance(value, (int, float)) else None for value in values]
+                    + [fund_data.get('error')])
+    return columns, _rows_to_batches(rows)
+
+def allocation_table(config, ages):
+    # Glide-path allocations for every age, one row per age
+    asset_classes = list(dict.fromkeys(asset_class for entry in config['glide_path']
+                                       for asset_class in entry['allocations']))
+    columns = [('age', 'int64')] + [(asset_class, 'float64') for asset_class in asset_classes]
+    def batches():
+        glide_path = get_glide_path(config)
+        # One vectorized lookup per batch of ages, so long ranges stay streamed
+        for offset in range(0, len(ages), BATCH_ROWS):
+            batch_ages = np.asarray(ages[offset:offset + BATCH_ROWS], dtype=np.int64)
+            grid = glide_path.grid(batch_ages)
+            yield [batch_ages] + [grid.get(asset_class, np.zeros(len(batch_ages))) for asset_class in asset_classes]
+    return columns, batches()
+
+def _rows_to_batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_ROWS:
+            yield [list(column) for column in zip(*batch)]
+            batch = []
+    if batch:
+        yield [list(column) for column in zip(*batch)]
+
+def stream_csv(columns, batches):
+    # Yields encoded CSV one batch at a time, so only BATCH_ROWS rows are ever buffered
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        values = []
+        for (_, kind), column in zip(columns, batch):
+            if kind == 'date':
+                values.append(days_to_dates(column).tolist())
+            elif isinstance(column, np.ndarray):
+                values.append(column.tolist())
+            else:
+                values.append(column)
+        writer.writerows(zip(*values))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder.encode('utf-8')
+
+def write_parquet(columns, batches, file):
+    # One row group per batch; raises ImportError when pyarrow is not installed
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {'string': pa.string(), 'float64': pa.float64(), 'int64': pa.int64(), 'date': pa.date32()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    with pq.ParquetWriter(file, schema) as writer:
+        for batch in batches:
+            arrays = []
+            for (_, kind), column in zip(columns, batch):
+                if kind == 'date':
+                    column = np.asarray(column, dtype=np.int32)
+                arrays.append(pa.array(column, type=types[kind]))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
@@ -0,0 +1,109 @@
+# utils/fetcher.py
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.price_store import get_price_arrays, get_price_history
+from utils.metrics import increment, observe
+
+MAX_WORKERS = 8
+FETCH_TIMEOUT = 30  # seconds allowed for a single attempt
+FETCH_RETRIES = 2
+RETRY_BACKOFF = 0.5  # seconds, doubled after every failed attempt
+_POLL_INTERVAL = 0.05
+
+# (fetch, symbol) -> Future of the fetch currently running for it, shared by every concurrent caller
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+# Results asgi.py awaited for the request this thread is serving, see set_prefetched
+_prefetched = threading.local()
+
+def fetch_coalesced(symbol, fetch):
+    # Runs fetch(symbol), or waits for an identical call already running on another thread
+    key = (fetch, symbol)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if not leader:
+        increment('fetch_coalesced_total')
+        return future.result()
+    try:
+        result = fetch(symbol)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+def set_prefetched(results):
+    # {symbol: (days, prices) or Exception} already awaited for the current request, or None.
+    # fetch_histories reuses them instead of fetching those symbols again with retries.
+    _prefetched.results = results
+
+def _fetch_with_retries(symbol, fetch, retries, backoff, attempt_started, lock):
+    for attempt in range(retries + 1):
+        started = time.monotonic()
+        with lock:
+            attempt_started[symbol] = started
+        try:
+            history = fetch_coalesced(symbol, fetch)
+            observe('symbol_fetch_seconds', time.monotonic() - started, {'symbol': symbol})
+            return history
+        except Exception:
+            increment('symbol_fetch_errors_total', {'symbol': symbol})
+            if attempt == retries:
+                raise
+        with lock:
+            attempt_started.pop(symbol, None)
+        time.sleep(backoff * (2 ** attempt))
+
+def fetch_histories(symbols, fetch=None, max_workers=MAX_WORKERS, timeout=FETCH_TIMEOUT,
+                    retries=FETCH_RETRIES, backoff=RETRY_BACKOFF):
+    # Returns {symbol: history DataFrame or the Exception that ended its fetch}
+    fetch = fetch or get_price_history
+    unique_symbols = list(dict.fromkeys(symbols))
+    results = {}
+    prefetched = getattr(_prefetched, 'results', None)
+    if prefetched and fetch in (get_price_history, get_price_arrays):
+        for symbol in unique_symbols:
+            result = prefetched.get(symbol)
+            # Arrays only stand in for the same fetch; a failure is reported whatever the fetch
+            if isinstance(result, Exception) or (result is not None and fetch is get_price_arrays):
+                results[symbol] = result
+        unique_symbols = [symbol for symbol in unique_symbols if symbol not in results]
+    if not unique_symbols:
+        return results
+    attempt_started = {}
+    lock = threading.Lock()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_symbols))))
+    try:
+        pending = {
+            executor.submit(_fetch_with_retries, symbol, fetch, retries, backoff, attempt_started, lock): symbol
+            for symbol in unique_symbols
+        }
+        while pending:
+            done, _ = wait(pending, timeout=_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    results[symbol] = e
+            now = time.monotonic()
+            with lock:
+                timed_out = [future for future, symbol in pending.items()
+                             if symbol in attempt_started and now - attempt_started[symbol] > timeout]
+            for future in timed_out:
+                # The worker thread cannot be interrupted; stop waiting on it instead
+                symbol = pending.pop(future)
+                increment('symbol_fetch_timeouts_total', {'symbol': symbol})
+                results[symbol] = TimeoutError(f"Timed out fetching {symbol} after {timeout} seconds")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,150 @@
+# utils/household.py
+
+import datetime
+import numpy as np
+import pandas as pd
+from utils.allocation import get_allocations
+from utils.config_manager import load_config, get_available_funds
+from utils.downsampling import RESAMPLE_FREQUENCIES
+from utils.fetcher import fetch_histories
+from utils.metrics import timer
+from utils.performance import PERIODS, get_fund_allocations
+from utils.performance_cache import get_performance_cache
+
+HOUSEHOLD = 'Household'
+
+def load_household_configs():
+    # Every fund in funds/, plus {fund_id: error} for configs that could not be loaded
+    configs = {}
+    errors = {}
+    for fund in get_available_funds():
+        try:
+            configs[fund['id']] = load_config(fund['id'])
+        except Exception as e:
+            errors[fund['id']] = f"{e}"
+    return configs, errors
+
+def household_symbols(configs):
+    # Union of the symbols of every fund, in first-seen order
+    return list(dict.fromkeys(
+        fund_info['symbol'] for config in configs.values() for funds in config['funds'].values() for fund_info in funds
+    ))
+
+def fund_shares(fund_ids, balances=None):
+    # Fraction of the household held in each fund: by balance when any is given, equal otherwise
+    balances = balances or {}
+    amounts = np.array([max(float(balances.get(fund_id, 0)), 0) for fund_id in fund_ids])
+    if amounts.sum() > 0:
+        return amounts / amounts.sum()
+    return np.full(len(fund_ids), 1 / len(fund_ids)) if fund_ids else amounts
+
+def weight_matrix(configs, symbols):
+    # funds x symbols matrix of each fund's current allocation, as fractions of the fund
+    columns = {symbol: col for col, symbol in enumerate(symbols)}
+    weights = np.zeros((len(configs), len(symbols)))
+    for row, config in enumerate(configs.values()):
+        for symbol, percentage in get_fund_allocations(config).items():
+            weights[row, columns[symbol]] = percentage / 100
+    return weights
+
+def weighted_series(prices, weights, fill='zero'):
+    # prices: date x symbol matrix; weights: series x symbol -> date x series values in one product.
+    # With 'ffill' a series is NaN until every symbol it holds has a price, as in weighted_portfolio_series
+    if fill not in ('zero', 'ffill'):
+        raise ValueError(f"Unsupported fill '{fill}', expected 'zero' or 'ffill'")
+    if fill == 'ffill':
+        prices = prices.ffill()
+    values = prices.to_numpy(dtype=float)
+    series = np.nan_to_num(values) @ weights.T
+    if fill == 'ffill':
+        missing = np.isnan(values).astype(float) @ (weights != 0).T
+        series[missing > 0] = np.nan
+    return series
+
+def weighted_returns(period_returns, symbols, weights, periods=PERIODS):
+    # Allocation-weighted period returns per row of weights, skipping symbols without a return
+    # the same way get_fund_performance does for a single fund
+    returns = np.array([[period_returns.get(symbol, {}).get(period, 'N/A') for period in periods] for symbol in symbols],
+                       dtype=object).reshape(len(symbols), len(periods))
+    valid = returns != 'N/A'
+    values = np.where(valid, returns, 0).astype(float)
+    totals = weights.sum(axis=1, keepdims=True)
+    shares = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+    weighted = shares @ values
+    covered = shares @ valid.astype(float)
+    return [
+        {period: round(float(weighted[row, col]), 2) if covered[row, col] > 0 else 'N/A' for col, period in enumerate(periods)}
+        for row in range(len(weights))
+    ]
+
+def build_household(configs, balances=None, fill='zero', histories=None):
+    # Fetches the union of symbols once and derives every fund's and the household's returns,
+    # asset class exposure and value series from one shared date x symbol price matrix
+    fund_ids = list(configs)
+    symbols = household_symbols(configs)
+    if histories is None:
+        with timer('fetch'):
+            histories = fetch_histories(symbols)
+    errors = {symbol: f"{hist}" for symbol, hist in histories.items() if isinstance(hist, Exception)}
+    with timer('returns'):
+        loaded = {symbol: histories[symbol] for symbol in symbols if symbol not in errors}
+        cache = get_performance_cache()
+        prices = cache.price_matrix(loaded)
+        period_returns = cache.period_returns(loaded, PERIODS)
+    with timer('merge'):
+        shares = fund_shares(fund_ids, balances)
+        weights = weight_matrix(configs, symbols)
+        household_weights = shares @ weights
+        all_weights = np.vstack([weights, household_weights])
+        returns = weighted_returns(period_returns, symbols, all_weights)
+        current_year = datetime.datetime.now().year
+        funds = {}
+        asset_classes = {}
+        for row, (fund_id, config) in enumerate(configs.items()):
+            age = current_year - config.get('date_of_birth', 0)
+            allocations = get_allocations(age, config)
+            for asset_class, percentage in allocations.items():
+                asset_classes[asset_class] = asset_classes.get(asset_class, 0) + shares[row] * percentage
+            funds[fund_id] = {
+                'fund_name': config.get('fund_name', fund_id),
+                'age': age,
+                'share': round(float(shares[row]) * 100, 2),
+                'returns': returns[row],
+                'asset_classes': {asset_class: round(float(percentage), 2) for asset_class, percentage in allocations.items()},
+            }
+        holdings = []
+        for col, symbol in enumerate(symbols):
+            holders = [fund_id for row, fund_id in enumerate(fund_ids) if weights[row, col]]
+            holdings.append({
+                'symbol': symbol,
+                'weight': round(float(household_weights[col]) * 100, 2),
+                'funds': holders,
+                'error': errors.get(symbol),
+            })
+        holdings.sort(key=lambda holding: holding['weight'], reverse=True)
+        columns = [symbol for symbol in symbols if symbol in prices.columns]
+        series = weighted_series(prices[columns], all_weights[:, [symbols.index(symbol) for symbol in columns]], fill=fill)
+        history = pd.DataFrame(series, index=prices.index, columns=fund_ids + [HOUSEHOLD])
+    return {
+        'funds': funds,
+        'household': {
+            'returns': returns[-1],
+            'asset_classes': {asset_class: round(float(percentage), 2) for asset_class, percentage in asset_classes.items()},
+        },
+        'holdings': holdings,
+        'errors': errors,
+        'history': history,
+        'as_of': datetime.datetime.now(),
+    }
+
+def resample_history(history, frequency=None, start=None, end=None):
+    # history: date x series frame from build_household -> same frame cut to [start, end] and resampled
+    if start:
+        history = history[history.index >= start]
+    if end:
+        history = history[history.index <= end]
+    if frequency is not None:
+        if frequency not in RESAMPLE_FREQUENCIES:
+            raise ValueError(f"Unsupported frequency '{frequency}', expected one of {', '.join(RESAMPLE_FREQUENCIES)}")
+        history = history.resample(RESAMPLE_FREQUENCIES[frequency]).last()
+    return history.dropna(how='all')
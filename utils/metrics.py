@@ -0,0 +1,107 @@
+# utils/metrics.py
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> {sorted label tuple: value}
+_counters = {}
+# name -> {sorted label tuple: [bucket counts, sum, count]}
+_histograms = {}
+_metrics_lock = threading.Lock()
+# Phases timed on the current thread since start_request(), for the Server-Timing header
+_request_state = threading.local()
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def increment(name, labels=None, value=1):
+    key = _label_key(labels)
+    with _metrics_lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+def observe(name, seconds, labels=None):
+    key = _label_key(labels)
+    with _metrics_lock:
+        series = _histograms.setdefault(name, {})
+        entry = series.get(key)
+        if entry is None:
+            entry = series[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry[0][i] += 1
+        entry[1] += seconds
+        entry[2] += 1
+
+def record_phase(phase, seconds, labels=None):
+    observe('phase_seconds', seconds, {'phase': phase, **(labels or {})})
+    phases = getattr(_request_state, 'phases', None)
+    if phases is not None:
+        phases.append((phase, seconds))
+
+@contextmanager
+def timer(phase, labels=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start, labels)
+
+def cache_result(cache, hit):
+    increment('cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+def start_request():
+    _request_state.phases = []
+
+def finish_request():
+    phases = getattr(_request_state, 'phases', None) or []
+    _request_state.phases = None
+    return phases
+
+def server_timing_header(phases, total=None):
+    # Durations of repeated phases are summed, keeping the order they first ran in
+    durations = {}
+    for phase, seconds in phases:
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', phase)
+        durations[name] = durations.get(name, 0.0) + seconds
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in durations.items())
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def render_prometheus():
+    # Prometheus text exposition format (version 0.0.4)
+    with _metrics_lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        histograms = {name: {key: (list(entry[0]), entry[1], entry[2]) for key, entry in series.items()}
+                      for name, series in _histograms.items()}
+    lines = []
+    for name in sorted(counters):
+        lines.append(f'# TYPE {name} counter')
+        for key, value in sorted(counters[name].items()):
+            lines.append(f'{name}{_format_labels(key)} {value}')
+    for name in sorted(histograms):
+        lines.append(f'# TYPE {name} histogram')
+        for key, (buckets, total, count) in sorted(histograms[name].items()):
+            for bound, bucket_count in zip(BUCKETS, buckets):
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", repr(bound))])} {bucket_count}')
+            lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_format_labels(key)} {total:.6f}')
+            lines.append(f'{name}_count{_format_labels(key)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def reset_metrics():
+    with _metrics_lock:
+        _counters.clear()
+        _histograms.clear()
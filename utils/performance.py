@@ -0,0 +1,221 @@
+# utils/performance.py
+
+import datetime
+import numpy as np
+import pandas as pd
+from utils.allocation import get_allocations
+from utils.fetcher import fetch_histories
+from utils.metrics import timer
+
+PERIODS = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
+# yfinance returns the last N bars for day periods and a calendar window for the rest
+BAR_PERIODS = {'1d': 1, '5d': 5}
+CALENDAR_PERIODS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+def build_price_matrix(histories):
+    # histories: {symbol: DataFrame with 'date' and 'price'} -> date x symbol frame, NaN where a symbol has no bar
+    series = {}
+    for symbol, hist in histories.items():
+        if hist is None or len(hist) == 0:
+            continue
+        hist = pd.DataFrame(hist)
+        prices = pd.Series(pd.to_numeric(hist['price']).to_numpy(), index=pd.to_datetime(hist['date']))
+        series[symbol] = prices[~prices.index.duplicated(keep='last')]
+    if not series:
+        return pd.DataFrame(index=pd.DatetimeIndex([]))
+    return pd.concat(series, axis=1).sort_index()
+
+def _first_row_where(mask):
+    # Index of the first True row per column, -1 where a column has none
+    first = mask.argmax(axis=0)
+    first[~mask.any(axis=0)] = -1
+    return first
+
+def compute_period_returns(prices, periods=PERIODS):
+    symbols = list(prices.columns)
+    if prices.empty or not symbols:
+        return {symbol: {period: 'N/A' for period in periods} for symbol in symbols}
+    dates = prices.index.values
+    values = prices.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    columns = np.arange(len(symbols))
+    has_data = valid.any(axis=0)
+    last_idx = len(dates) - 1 - valid[::-1].argmax(axis=0)
+    end_prices = values[last_idx, columns]
+    last_dates = pd.DatetimeIndex(dates[last_idx])
+    bar_counts = np.cumsum(valid, axis=0)
+
+    start_idx = {}
+    for period in periods:
+        if period in BAR_PERIODS:
+            first_bar = bar_counts[-1] - BAR_PERIODS[period] + 1
+            start_idx[period] = _first_row_where(valid & (bar_counts >= np.maximum(first_bar, 1)))
+        elif period in CALENDAR_PERIODS:
+            start_dates = (last_dates - CALENDAR_PERIODS[period]).values
+            start_idx[period] = _first_row_where(valid & (dates[:, None] >= start_dates[None, :]))
+        elif period == 'ytd':
+            start_dates = pd.to_datetime(last_dates.year.astype(str) + '-01-01').values
+            start_idx[period] = _first_row_where(valid & (dates[:, None] >= start_dates[None, :]))
+        elif period == 'max':
+            start_idx[period] = _first_row_where(valid)
+        else:
+            raise ValueError(f"Unsupported period '{period}'")
+
+    returns = {symbol: {} for symbol in symbols}
+    for period in periods:
+        idx = start_idx[period]
+        usable = has_data & (idx >= 0) & (idx < last_idx)
+        start_prices = values[np.where(usable, idx, 0), columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            period_returns = (end_prices / start_prices - 1) * 100
+        for col, symbol in enumerate(symbols):
+            if usable[col] and np.isfinite(period_returns[col]):
+                returns[symbol][period] = round(float(period_returns[col]), 2)
+            else:
+                returns[symbol][period] = 'N/A'
+    return returns
+
+def compute_returns(hist, periods=PERIODS):
+    return compute_period_returns(build_price_matrix({'price': hist}), periods).get('price', {period: 'N/A' for period in periods})
+
+def weighted_portfolio_series(prices, weights, fill='zero'):
+    # prices: date x symbol matrix from build_price_matrix; weights: {symbol: fraction of the portfolio}
+    if fill not in ('zero', 'ffill'):
+        raise ValueError(f"Unsupported fill '{fill}', expected 'zero' or 'ffill'")
+    symbols = [symbol for symbol in prices.columns if weights.get(symbol, 0)]
+    if prices.empty or not symbols:
+        return pd.DataFrame(columns=['date', 'price'])
+    matrix = prices[symbols]
+    if fill == 'ffill':
+        # Carry prices over gaps and start the series once every weighted fund has a price,
+        # instead of counting a fund as worth 0 before its inception date
+        matrix = matrix.ffill()
+        matrix = matrix[matrix.notna().all(axis=1).to_numpy()]
+    values = np.nan_to_num(matrix.to_numpy(dtype=float)) @ np.array([weights[symbol] for symbol in symbols], dtype=float)
+    return pd.DataFrame({'date': matrix.index.strftime('%Y-%m-%d'), 'price': values})
+
+def load_price_matrix(fund_symbols):
+    # Aligned date x symbol prices for every symbol whose history could be loaded
+    with timer('fetch'):
+        histories = fetch_histories(fund_symbols)
+    return build_price_matrix({symbol: hist for symbol, hist in histories.items() if not isinstance(hist, Exception)})
+
+def get_fund_allocations(config):
+    # Calculate current age
+    current_year = datetime.datetime.now().year
+    date_of_birth = config.get('date_of_birth', 0)
+    age = current_year - date_of_birth
+    # Get current allocations
+    current_allocations = get_allocations(age, config)
+    # Build a mapping from fund symbol to allocation percentage
+    fund_allocations = {}
+    for asset_class, allocation_percentage in current_allocations.items():
+        funds = config['funds'].get(asset_class, [])
+        for fund_info in funds:
+            symbol = fund_info['symbol']
+            fund_percentage = fund_info['percentage']
+            total_percentage = (allocation_percentage * fund_percentage) / 100
+            fund_allocations[symbol] = total_percentage
+    return fund_allocations
+
+def get_fund_performance(fund_symbols, config, fill='zero', include_history=True, histories=None):
+    from utils.performance_cache import get_performance_cache
+    cache = get_performance_cache()
+    # Get historical data for every symbol concurrently, unless the caller already loaded it
+    if histories is None:
+        with timer('fetch'):
+            histories = fetch_histories(fund_symbols)
+    histories = {symbol: histories[symbol] for symbol in fund_symbols}
+    # Reused while no symbol's bars, the config or the current age changed; otherwise only the
+    # returns of symbols with new bars are recomputed
+    data = cache.fund_result(histories, config, lambda: _performance_table(fund_symbols, config, histories, cache))
+    if not include_history:
+        return data, {}
+    historical_data = {symbol: hist[['date', 'price']] for symbol, hist in histories.items() if 'error' not in data[symbol]}
+    with timer('merge'):
+        # Calculate overall historical data as one weighted sum over the aligned price matrix
+        fund_allocations = get_fund_allocations(config)
+        weights = {symbol: fund_allocations.get(symbol, 0) / 100 for symbol in historical_data}
+        overall_hist = cache.weighted_series(historical_data, weights, fill=fill)
+    with timer('serialize'):
+        if not overall_hist.empty:
+            historical_data['Overall Portfolio'] = overall_hist.to_dict(orient='records')
+        # Convert individual fund historical data to list of dicts
+        for symbol in fund_symbols:
+            hist = historical_data.get(symbol)
+            if hist is not None and not isinstance(hist, list):
+                historical_data[symbol] = hist.to_dict(orient='records')
+    return data, historical_data
+
+def _performance_table(fund_symbols, config, histories, cache):
+    data = {}
+    loaded = {}
+    fund_allocations = get_fund_allocations(config)
+    # Define periods
+    periods = PERIODS
+    with timer('returns'):
+        for symbol in fund_symbols:
+            try:
+                hist = histories[symbol]
+                if isinstance(hist, Exception):
+                    raise hist
+                if len(hist) >= 2:
+                    current_price = float(hist['price'].iloc[-1])
+                    previous_close = float(hist['price'].iloc[-2])
+                else:
+                    current_price = float(hist['price'].iloc[-1])
+                    previous_close = current_price
+                daily_change = current_price - previous_close
+                daily_change_percent = (daily_change / previous_close) * 100 if previous_close else 0
+                allocation_percentage = fund_allocations.get(symbol, 0)
+                data[symbol] = {
+                    'current_price': round(current_price, 2) if current_price else 'N/A',
+                    'daily_change': round(daily_change, 2) if daily_change else 'N/A',
+                    'daily_change_percent': round(daily_change_percent, 2) if daily_change_percent else 'N/A',
+                    'allocation_percentage': round(allocation_percentage, 2),
+                    'returns': {period: 'N/A' for period in periods}
+                }
+                loaded[symbol] = hist
+            except Exception as e:
+                data[symbol] = {
+                    'error': f"{e}"
+                }
+        # Compute every trailing-period return from the already loaded histories in one pass
+        period_returns = cache.period_returns(loaded, periods)
+        for symbol, returns in period_returns.items():
+            if 'error' not in data[symbol]:
+                data[symbol]['returns'] = dict(returns)
+    with timer('merge'):
+        # Calculate overall fund performance
+        total_allocations = sum(fund_allocations.values())
+        overall_returns = {}
+        for period in periods:
+            weighted_return = 0
+            total_weight = 0
+            for symbol in fund_symbols:
+                fund_data = data.get(symbol)
+                if fund_data and 'returns' in fund_data and fund_data['returns'].get(period) != 'N/A':
+                    allocation = fund_allocations.get(symbol, 0)
+                    fund_return = fund_data['returns'][period]
+                    weighted_return += (allocation / total_allocations) * fund_return
+                    total_weight += allocation / total_allocations
+            if total_weight > 0:
+                overall_returns[period] = round(weighted_return, 2)
+            else:
+                overall_returns[period] = 'N/A'
+    data['Overall Portfolio'] = {
+        'current_price': 'N/A',
+        'daily_change': 'N/A',
+        'daily_change_percent': 'N/A',
+        'allocation_percentage': 100.0,
+        'returns': overall_returns
+    }
+    return data
@@ -0,0 +1,259 @@
+# utils/performance_cache.py
+
+import datetime
+import itertools
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.metrics import cache_result, increment
+from utils.refresher import config_signature
+
+MAX_SYMBOLS = 512
+MAX_MATRICES = 64
+MAX_RESULTS = 256
+
+def _to_datetime64(dates):
+    # numpy parses ISO dates far faster than pandas for the few bars of an append
+    try:
+        return np.asarray(dates, dtype='datetime64[ns]')
+    except (TypeError, ValueError):
+        return pd.to_datetime(dates).values.astype('datetime64[ns]')
+
+def _fill_matrix(dates, columns, series):
+    # date x symbol float matrix on the sorted dates, NaN where a symbol has no bar
+    values = np.full((len(dates), len(columns)), np.nan)
+    for col, symbol in enumerate(columns):
+        if symbol in series:
+            symbol_dates, prices = series[symbol]
+            values[np.searchsorted(dates, symbol_dates), col] = prices
+    return values
+
+def _entries_matrix(entries):
+    # Aligned date x symbol frame from parsed symbol entries, as build_price_matrix builds it from histories
+    if not entries:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
+    dates = np.unique(np.concatenate([entry['dates'] for entry in entries.values()]))
+    values = _fill_matrix(dates, list(entries), {symbol: (entry['dates'], entry['prices']) for symbol, entry in entries.items()})
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='date'), columns=list(entries))
+
+class PerformanceCache:
+    # Stage results of get_fund_performance, each kept for the inputs it depends on:
+    #   symbol: parsed bars and period returns, per data version of the symbol's history
+    #   matrix: a fund's date x symbol prices, per version of each of its symbols
+    #   series: the overall weighted series, per matrix version, weights and fill
+    #   result: a fund's performance table, per symbol versions, config hash and current age
+    # When a history only gained new bars, its version moves on by an append: the new dates are
+    # parsed on their own, and the matrix and the zero-filled series are extended rather than rebuilt.
+    def __init__(self, max_symbols=MAX_SYMBOLS, max_matrices=MAX_MATRICES, max_results=MAX_RESULTS):
+        self.max_symbols = max_symbols
+        self.max_matrices = max_matrices
+        self.max_results = max_results
+        self._symbols = OrderedDict()
+        self._matrices = OrderedDict()
+        self._series = OrderedDict()
+        self._results = OrderedDict()
+        # Versions are never reused, so an evicted and re-added symbol cannot match stale results
+        self._versions = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def _store(self, entries, key, value, limit):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+            increment('performance_cache_evictions_total')
+
+    def _symbol(self, symbol, hist):
+        # Entry for the symbol's current bars: the cached one if unchanged, extended if bars were appended
+        raw_prices = hist['price'].to_numpy()
+        raw_prices = raw_prices if raw_prices.dtype == np.float64 else pd.to_numeric(hist['price']).to_numpy(dtype=float)
+        raw_dates = hist['date']
+        entry = self._symbols.get(symbol)
+        if entry is not None:
+            n = len(entry['raw_prices'])
+            if (len(raw_prices) >= n and raw_dates.iloc[n - 1] == entry['raw_last_date']
+                    and np.array_equal(raw_prices[:n], entry['raw_prices'], equal_nan=True)):
+                if len(raw_prices) == n:
+                    self._symbols.move_to_end(symbol)
+                    cache_result('performance_symbol', True)
+                    return entry
+                new_dates = _to_datetime64(raw_dates.iloc[n:].to_numpy())
+                if new_dates[0] > entry['dates'][-1] and (np.diff(new_dates) > np.timedelta64(0)).all():
+                    increment('performance_cache_appends_total', {'stage': 'symbol'})
+                    entry = {
+                        'raw_prices': raw_prices,
+                        'raw_last_date': raw_dates.iloc[-1],
+                        'dates': np.concatenate([entry['dates'], new_dates]),
+                        'prices': np.concatenate([entry['prices'], raw_prices[n:]]),
+                        'version': next(self._versions),
+                        'rewritten': entry['rewritten'],
+                        'returns': {},
+                    }
+                    self._store(self._symbols, symbol, entry, self.max_symbols)
+                    return entry
+        cache_result('performance_symbol', False)
+        series = pd.Series(raw_prices, index=_to_datetime64(raw_dates.to_numpy()))
+        series = series[~series.index.duplicated(keep='last')].sort_index()
+        version = next(self._versions)
+        entry = {
+            'raw_prices': raw_prices,
+            'raw_last_date': raw_dates.iloc[-1],
+            'dates': series.index.values,
+            'prices': series.to_numpy(),
+            'version': version,
+            # Version of the last change that was not an append; matrices built before it cannot be extended
+            'rewritten': version,
+            'returns': {},
+        }
+        self._store(self._symbols, symbol, entry, self.max_symbols)
+        return entry
+
+    def _symbol_entries(self, histories):
+        entries = {}
+        for symbol, hist in histories.items():
+            if hist is None or isinstance(hist, Exception):
+                continue
+            hist = hist if isinstance(hist, pd.DataFrame) else pd.DataFrame(hist)
+            # Histories that cannot be read are reported as errors by get_fund_performance
+            if len(hist) > 0 and 'date' in hist and 'price' in hist:
+                entries[symbol] = self._symbol(symbol, hist)
+        return entries
+
+    def symbol_versions(self, histories):
+        # {symbol: data version} for every loaded history
+        with self._lock:
+            return {symbol: entry['version'] for symbol, entry in self._symbol_entries(histories).items()}
+
+    def period_returns(self, histories, periods):
+        # compute_period_returns for every loaded history, recomputing only symbols whose bars changed
+        from utils.performance import compute_period_returns
+        periods = tuple(periods)
+        with self._lock:
+            entries = self._symbol_entries(histories)
+            stale = {symbol: entry for symbol, entry in entries.items() if periods not in entry['returns']}
+            if stale:
+                # Each symbol's returns only depend on its own column, so the stale ones are computed together
+                for symbol, returns in compute_period_returns(_entries_matrix(stale), periods).items():
+                    stale[symbol]['returns'][periods] = returns
+            return {symbol: entry['returns'][periods] for symbol, entry in entries.items()}
+
+    def _matrix(self, histories):
+        # Matrix entry for the loaded histories, extending the cached one when symbols only gained bars
+        entries = self._symbol_entries(histories)
+        key = tuple(entries)
+        versions = {symbol: entry['version'] for symbol, entry in entries.items()}
+        cached = self._matrices.get(key)
+        if cached is not None and cached['versions'] == versions:
+            self._matrices.move_to_end(key)
+            cache_result('performance_matrix', True)
+            return cached
+        cache_result('performance_matrix', False)
+        extended = self._extend_matrix(cached, entries) if cached is not None else None
+        if extended is not None:
+            increment('performance_cache_appends_total', {'stage': 'matrix'})
+            prices, changed_from = extended
+            parent = cached['version']
+        else:
+            prices, changed_from, parent = _entries_matrix(entries), None, None
+        matrix = {
+            'prices': prices,
+            'versions': versions,
+            'lengths': {symbol: len(entry['prices']) for symbol, entry in entries.items()},
+            'rewritten': {symbol: entry['rewritten'] for symbol, entry in entries.items()},
+            'version': next(self._versions),
+            # Matrix this one was extended from and the first date that differs from it
+            'parent': parent,
+            'changed_from': changed_from,
+        }
+        self._store(self._matrices, key, matrix, self.max_matrices)
+        return matrix
+
+    def _extend_matrix(self, cached, entries):
+        # (prices with the appended bars added, first changed date), or None if a rebuild is needed
+        tails = {}
+        for symbol, entry in entries.items():
+            if entry['version'] == cached['versions'][symbol]:
+                continue
+            if entry['rewritten'] != cached['rewritten'][symbol]:
+                return None
+            n = cached['lengths'][symbol]
+            tails[symbol] = (entry['dates'][n:], entry['prices'][n:])
+        prices = cached['prices']
+        old_dates = prices.index.values
+        tail_dates = np.unique(np.concatenate([dates for dates, _ in tails.values()]))
+        new_dates = tail_dates[tail_dates > old_dates[-1]] if len(old_dates) else tail_dates
+        # A bar dated inside the old range on a day no other symbol traded would need a new middle row
+        if not np.isin(tail_dates[:len(tail_dates) - len(new_dates)], old_dates).all():
+            return None
+        dates = np.concatenate([old_dates, new_dates])
+        values = _fill_matrix(dates, list(prices.columns), tails)
+        old_values = prices.to_numpy()
+        values[:len(old_dates)] = np.where(np.isnan(values[:len(old_dates)]), old_values, values[:len(old_dates)])
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='date'), columns=prices.columns), pd.Timestamp(tail_dates[0])
+
+    def price_matrix(self, histories):
+        # build_price_matrix for the loaded histories
+        with self._lock:
+            return self._matrix(histories)['prices']
+
+    def weighted_series(self, histories, weights, fill='zero'):
+        # weighted_portfolio_series over the price matrix of the loaded histories
+        from utils.performance import weighted_portfolio_series
+        with self._lock:
+            matrix = self._matrix(histories)
+            key = (tuple(matrix['versions']), tuple(sorted(weights.items())), fill)
+            cached = self._series.get(key)
+            if cached is not None and cached['matrix'] == matrix['version']:
+                self._series.move_to_end(key)
+                cache_result('performance_series', True)
+                return cached['series']
+            cache_result('performance_series', False)
+            prices = matrix['prices']
+            if cached is not None and fill == 'zero' and matrix['parent'] == cached['matrix']:
+                # Rows before the first appended bar are unchanged; only the rows from there on are recomputed
+                increment('performance_cache_appends_total', {'stage': 'series'})
+                start = matrix['changed_from'].strftime('%Y-%m-%d')
+                head = cached['series'][cached['series']['date'] < start]
+                tail = weighted_portfolio_series(prices[prices.index >= matrix['changed_from']], weights, fill=fill)
+                series = pd.concat([head, tail], ignore_index=True) if len(head) else tail
+            else:
+                series = weighted_portfolio_series(prices, weights, fill=fill)
+            self._store(self._series, key, {'matrix': matrix['version'], 'series': series}, self.max_results)
+            return series
+
+    def fund_result(self, histories, config, compute):
+        # compute() for the fund, reused while its symbols' data versions, its config and the
+        # current age (which picks the glide-path allocations) are unchanged
+        age = datetime.datetime.now().year - config.get('date_of_birth', 0)
+        errors = tuple(sorted(symbol for symbol, hist in histories.items() if isinstance(hist, Exception)))
+        signature = config_signature(config)
+        with self._lock:
+            key = (tuple(self.symbol_versions(histories).items()), errors, signature, age)
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                cache_result('performance_result', True)
+                return cached
+        cache_result('performance_result', False)
+        result = compute()
+        with self._lock:
+            self._store(self._results, key, result, self.max_results)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._symbols.clear()
+            self._matrices.clear()
+            self._series.clear()
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'symbols': len(self._symbols), 'matrices': len(self._matrices),
+                    'series': len(self._series), 'results': len(self._results)}
+
+_performance_cache = PerformanceCache()
+
+def get_performance_cache():
+    return _performance_cache
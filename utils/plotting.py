@@ -0,0 +1,35 @@
+# utils/plotting.py
+#
+# Optional matplotlib helpers. The web UI draws its charts with Chart.js, so the app never
+# imports this module and matplotlib is only needed when it is used directly.
+
+from utils.config_manager import load_config
+from utils.allocation import get_glide_path
+import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')  # Use non-interactive backend
+import io
+import base64
+
+def plot_allocations(config=None):
+    if config is None:
+        config = load_config()
+    ages = list(range(1, 101))
+    allocations_over_age = get_glide_path(config).grid(ages)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.stackplot(ages, allocations_over_age.values(), labels=allocations_over_age.keys())
+    ax.legend(loc='upper right')
+    ax.set_xlabel('Age')
+    ax.set_ylabel('Allocation Percentage')
+    ax.set_title('Asset Allocation Over Age')
+
+    # Save the plot to a bytes buffer and encode it
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png')
+    buf.seek(0)
+    image_png = buf.getvalue()
+    buf.close()
+    plt.close(fig)
+    graph = base64.b64encode(image_png).decode('utf-8')
+    return graph
@@ -0,0 +1,142 @@
+# utils/price_cache.py
+
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.metrics import increment
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Memory-mapped file layout: int64 length, int64 store mtime_ns, int64 store size, float64 last_checked,
+# then int32 day numbers, padding to 8 bytes, then float64 prices
+_HEADER_BYTES = 32
+
+def dates_to_days(dates):
+    # 'YYYY-MM-DD' strings -> int32 days since 1970-01-01
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int32)
+
+def days_to_dates(days):
+    return np.datetime_as_string(np.asarray(days, dtype=np.int64).astype('datetime64[D]'), unit='D')
+
+def _prices_offset(length):
+    return _HEADER_BYTES + (length * 4 + 7) // 8 * 8
+
+class PriceCache:
+    # LRU cache of each symbol's history as contiguous int32 day numbers and float64 prices.
+    # Entries are tagged with the signature of the symbol's SQLite file, so a write by any
+    # process invalidates them. With mmap_dir set, series are written there and memory-mapped,
+    # so every worker process maps the same pages instead of holding its own copy.
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, mmap_dir=None):
+        self.max_bytes = max_bytes
+        self.mmap_dir = mmap_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _mmap_path(self, symbol):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._^=-]', '_', symbol)
+        return os.path.join(self.mmap_dir, f'{safe_symbol}.prices')
+
+    def get(self, symbol, signature):
+        # (days, prices, last_checked) if cached for this store signature, else None
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(symbol)
+                return entry[1:]
+        if self.mmap_dir is None:
+            return None
+        # Another worker may already have mapped this version of the series
+        mapped = self._load_mmap(symbol, signature)
+        if mapped is None:
+            return None
+        self._insert(symbol, (signature, *mapped))
+        return mapped
+
+    def put(self, symbol, signature, days, prices, last_checked):
+        days = np.ascontiguousarray(days, dtype=np.int32)
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if self.mmap_dir is not None:
+            try:
+                self._write_mmap(symbol, signature, days, prices, last_checked)
+                mapped = self._load_mmap(symbol, signature)
+                if mapped is not None:
+                    days, prices, last_checked = mapped
+            except OSError:
+                pass  # Fall back to a private in-memory copy
+        self._insert(symbol, (signature, days, prices, last_checked))
+        return days, prices
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'symbols': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                    'mmap_dir': self.mmap_dir}
+
+    def _insert(self, symbol, entry):
+        size = entry[1].nbytes + entry[2].nbytes
+        with self._lock:
+            previous = self._entries.pop(symbol, None)
+            if previous is not None:
+                self._bytes -= previous[1].nbytes + previous[2].nbytes
+            if size > self.max_bytes:
+                return
+            while self._entries and self._bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[1].nbytes + evicted[2].nbytes
+                increment('price_cache_evictions_total')
+            self._entries[symbol] = entry
+            self._bytes += size
+
+    def _write_mmap(self, symbol, signature, days, prices, last_checked):
+        os.makedirs(self.mmap_dir, exist_ok=True)
+        length = len(days)
+        buffer = bytearray(_prices_offset(length) + length * 8)
+        np.frombuffer(buffer, dtype=np.int64, count=3)[:] = (length, signature[0], signature[1])
+        np.frombuffer(buffer, dtype=np.float64, count=1, offset=24)[0] = last_checked
+        np.frombuffer(buffer, dtype=np.int32, count=length, offset=_HEADER_BYTES)[:] = days
+        np.frombuffer(buffer, dtype=np.float64, count=length, offset=_prices_offset(length))[:] = prices
+        # Replace atomically; processes still mapping the old file keep its pages until they let go
+        fd, temp_path = tempfile.mkstemp(dir=self.mmap_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer)
+            os.replace(temp_path, self._mmap_path(symbol))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _load_mmap(self, symbol, signature):
+        try:
+            mapped = np.memmap(self._mmap_path(symbol), dtype=np.uint8, mode='r')
+        except (OSError, ValueError):
+            return None
+        if len(mapped) < _HEADER_BYTES:
+            return None
+        length, mtime_ns, size = (int(value) for value in mapped[:24].view(np.int64))
+        if (mtime_ns, size) != tuple(signature) or len(mapped) != _prices_offset(length) + length * 8:
+            return None
+        last_checked = float(mapped[24:32].view(np.float64)[0])
+        days = mapped[_HEADER_BYTES:_HEADER_BYTES + length * 4].view(np.int32)
+        prices = mapped[_prices_offset(length):].view(np.float64)
+        return days, prices, last_checked
+
+# Shared by the price store; every recently used series is looked up here before touching SQLite
+_price_cache = PriceCache()
+
+def get_price_cache():
+    return _price_cache
+
+def configure_price_cache(max_bytes, mmap_dir=None):
+    # Replaces the cache only when the settings change, so it is cheap to call on every request
+    global _price_cache
+    if _price_cache.max_bytes != max_bytes or _price_cache.mmap_dir != mmap_dir:
+        _price_cache = PriceCache(max_bytes, mmap_dir)
+    return _price_cache
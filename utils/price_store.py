@@ -0,0 +1,177 @@
+# utils/price_store.py
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from utils.metrics import cache_result, increment, observe
+from utils.price_cache import get_price_cache, dates_to_days, days_to_dates
+
+logger = logging.getLogger(__name__)
+
+PRICE_STORE_DIR = os.path.join('data', 'prices')
+# Seconds before a stored symbol is checked upstream for new bars
+REFRESH_INTERVAL = 6 * 60 * 60
+
+_symbol_locks = {}
+_symbol_locks_guard = threading.Lock()
+
+def fetch_yfinance_history(symbol, start=None):
+    import yfinance as yf  # Slow to import, so only loaded when a fetch actually goes upstream
+    fund = yf.Ticker(symbol)
+    if start is None:
+        hist = fund.history(period='max')
+    else:
+        hist = fund.history(start=start)
+    if hist.empty:
+        return pd.DataFrame(columns=['date', 'price'])
+    if 'Adj Close' in hist.columns:
+        price_col = 'Adj Close'
+    else:
+        price_col = 'Close'
+    hist = hist.reset_index().rename(columns={price_col: 'price', 'Date': 'date'})
+    hist['date'] = hist['date'].dt.strftime('%Y-%m-%d')
+    return hist[['date', 'price']]
+
+_price_provider = fetch_yfinance_history
+
+def _timed_fetch(provider, symbol, start=None):
+    # Latency of the upstream provider itself, separate from the SQLite reads around it
+    started = time.perf_counter()
+    try:
+        return provider(symbol) if start is None else provider(symbol, start=start)
+    except Exception:
+        increment('upstream_fetch_errors_total', {'symbol': symbol})
+        raise
+    finally:
+        observe('upstream_fetch_seconds', time.perf_counter() - started, {'symbol': symbol})
+
+def set_price_provider(provider):
+    # provider(symbol, start=None) -> DataFrame with 'date' (YYYY-MM-DD) and 'price' columns
+    global _price_provider
+    _price_provider = provider if provider is not None else fetch_yfinance_history
+
+def _store_path(symbol):
+    safe_symbol = re.sub(r'[^A-Za-z0-9._^=-]', '_', symbol)
+    return os.path.join(PRICE_STORE_DIR, f'{safe_symbol}.sqlite')
+
+def _symbol_lock(symbol):
+    with _symbol_locks_guard:
+        lock = _symbol_locks.get(symbol)
+        if lock is None:
+            lock = _symbol_locks[symbol] = threading.Lock()
+        return lock
+
+def _connect(symbol):
+    os.makedirs(PRICE_STORE_DIR, exist_ok=True)
+    conn = sqlite3.connect(_store_path(symbol))
+    conn.execute('CREATE TABLE IF NOT EXISTS prices (date TEXT PRIMARY KEY, price REAL NOT NULL)')
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    return conn
+
+def _last_bar(conn):
+    return conn.execute('SELECT date, price FROM prices ORDER BY date DESC LIMIT 1').fetchone()
+
+def _last_checked(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'last_checked'").fetchone()
+    return float(row[0]) if row else 0.0
+
+def _write_bars(conn, bars, replace=False):
+    with conn:
+        if replace:
+            conn.execute('DELETE FROM prices')
+        conn.executemany('INSERT OR REPLACE INTO prices (date, price) VALUES (?, ?)',
+                         zip(bars['date'].astype(str), bars['price'].astype(float)))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_checked', ?)", (str(time.time()),))
+
+def update_price_history(symbol, provider=None, max_age=None):
+    # With max_age, skips the fetch if another thread checked the symbol upstream within max_age
+    # seconds while this one waited for the lock
+    provider = provider or _price_provider
+    with _symbol_lock(symbol):
+        conn = _connect(symbol)
+        try:
+            last_bar = _last_bar(conn)
+            if last_bar is not None and max_age is not None and time.time() - _last_checked(conn) <= max_age:
+                return
+            if last_bar is None:
+                _write_bars(conn, _timed_fetch(provider, symbol).dropna(subset=['price']), replace=True)
+                return
+            last_date, last_price = last_bar
+            # Re-request the last stored bar so adjusted-price revisions can be detected
+            bars = _timed_fetch(provider, symbol, start=last_date).dropna(subset=['price'])
+            overlap = bars[bars['date'] == last_date]
+            if not overlap.empty and abs(float(overlap['price'].iloc[0]) - last_price) > 1e-6 * abs(last_price):
+                # A dividend or split re-adjusted the whole series, so append is not safe
+                _write_bars(conn, _timed_fetch(provider, symbol).dropna(subset=['price']), replace=True)
+            else:
+                _write_bars(conn, bars[bars['date'] > last_date])
+        finally:
+            conn.close()
+
+def has_price_history(symbol):
+    # Whether the store already holds bars for the symbol, without going upstream
+    path = _store_path(symbol)
+    if not os.path.exists(path):
+        return False
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('SELECT 1 FROM prices LIMIT 1').fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+def _store_signature(symbol):
+    try:
+        stat_result = os.stat(_store_path(symbol))
+    except FileNotFoundError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+def get_price_arrays(symbol, provider=None, max_age=REFRESH_INTERVAL):
+    # (int32 days since 1970-01-01, float64 prices) for the symbol, served from the price cache
+    # while the SQLite file is unchanged and was checked upstream within max_age seconds
+    price_cache = get_price_cache()
+    signature = _store_signature(symbol)
+    cached = price_cache.get(symbol, signature) if signature is not None else None
+    if cached is not None and time.time() - cached[2] <= max_age:
+        cache_result('price_cache', True)
+        return cached[0], cached[1]
+    cache_result('price_cache', False)
+    conn = _connect(symbol)
+    try:
+        has_bars = _last_bar(conn) is not None
+        needs_update = not has_bars or time.time() - _last_checked(conn) > max_age
+    finally:
+        conn.close()
+    cache_result('price_store', not needs_update)
+    if needs_update:
+        try:
+            update_price_history(symbol, provider, max_age=max_age)
+        except Exception as e:
+            if not has_bars:
+                raise
+            # Stale prices beat an error row; the next request tries upstream again
+            logger.warning('Refreshing %s failed, serving stored prices: %s', symbol, e)
+    # Take the signature before reading, so a concurrent write can only make the entry look stale
+    signature = _store_signature(symbol)
+    conn = _connect(symbol)
+    try:
+        rows = conn.execute('SELECT date, price FROM prices ORDER BY date').fetchall()
+        last_checked = _last_checked(conn)
+    finally:
+        conn.close()
+    if not rows:
+        raise Exception(f"No historical data available for {symbol}")
+    dates, prices = zip(*rows)
+    return price_cache.put(symbol, signature, dates_to_days(dates), np.array(prices, dtype=np.float64), last_checked)
+
+def get_price_history(symbol, provider=None, max_age=REFRESH_INTERVAL):
+    days, prices = get_price_arrays(symbol, provider, max_age)
+    return pd.DataFrame({'date': days_to_dates(days), 'price': prices})
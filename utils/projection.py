@@ -0,0 +1,152 @@
+# utils/projection.py
+
+import atexit
+import datetime
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from utils.allocation import get_glide_path
+from utils.performance import weighted_portfolio_series
+
+# Long-run (annual mean, annual volatility) assumptions used when no history is bootstrapped
+DEFAULT_RETURN_ASSUMPTIONS = {
+    'us_stock': (0.07, 0.16),
+    'intl_stock': (0.065, 0.18),
+    'us_bond': (0.03, 0.06),
+    'intl_bond': (0.03, 0.07),
+    'short_term_tips': (0.02, 0.03),
+}
+PERCENTILES = [5, 25, 50, 75, 95]
+CHUNK_SIZE = 10000
+END_AGE = 95
+
+# One process pool shared by every projection, started on the first parallel run
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+def _get_executor(workers):
+    # Replaced only when a different worker count is asked for; the app always uses the default
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None and _executor_workers != workers:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+        return _executor
+
+def _discard_executor(executor=None):
+    # Shuts down the shared pool (or only the given one, if it is still the shared pool)
+    global _executor
+    with _executor_lock:
+        if _executor is not None and executor in (None, _executor):
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+atexit.register(_discard_executor)
+
+def asset_class_annual_returns(prices, config):
+    # Calendar-year returns of each asset class, using its funds' configured percentages
+    annual = {}
+    for asset_class, funds in config['funds'].items():
+        weights = {fund_info['symbol']: fund_info['percentage'] / 100 for fund_info in funds
+                   if fund_info['symbol'] in prices.columns}
+        if not weights:
+            continue
+        series = weighted_portfolio_series(prices, weights, fill='ffill')
+        if series.empty:
+            continue
+        year_end = pd.Series(series['price'].to_numpy(), index=pd.to_datetime(series['date'])).resample('YE').last()
+        annual[asset_class] = year_end.pct_change().dropna()
+    if not annual:
+        return pd.DataFrame()
+    # Only years every asset class has data for, so resampled years keep their cross-asset correlation
+    return pd.DataFrame(annual).dropna()
+
+def _simulate_chunk(args):
+    seed, paths, allocations, contributions, method, returns_source, initial_amount = args
+    rng = np.random.default_rng(seed)
+    n_years, n_classes = allocations.shape
+    if method == 'bootstrap':
+        draws = returns_source[rng.integers(0, len(returns_source), size=(paths, n_years))]
+    else:
+        means, volatilities = returns_source
+        draws = rng.normal(means, volatilities, size=(paths, n_years, n_classes))
+    portfolio_returns = np.einsum('pyc,yc->py', draws, allocations)
+    wealth = np.empty((paths, n_years + 1))
+    wealth[:, 0] = initial_amount
+    for year in range(n_years):
+        wealth[:, year + 1] = np.maximum((wealth[:, year] + contributions[year]) * (1 + portfolio_returns[:, year]), 0)
+    return wealth
+
+def run_projection(config, initial_amount, annual_contribution=0.0, retirement_age=65, annual_withdrawal=0.0,
+                   paths=10000, method='parametric', annual_returns=None, assumptions=None, seed=None,
+                   workers=None, current_age=None):
+    # Wealth percentiles from now to END_AGE. method='bootstrap' resamples whole years of
+    # annual_returns (from asset_class_annual_returns); 'parametric' draws normal returns.
+    if method not in ('parametric', 'bootstrap'):
+        raise ValueError(f"Unsupported method '{method}', expected 'parametric' or 'bootstrap'")
+    if current_age is None:
+        current_age = datetime.datetime.now().year - config.get('date_of_birth', 0)
+    ages = np.arange(current_age, END_AGE)
+    if len(ages) == 0:
+        raise ValueError(f'The projection runs until age {END_AGE}; current age is {current_age}.')
+    if paths < 1:
+        raise ValueError('The number of paths must be at least 1.')
+    allocation_grid = get_glide_path(config).grid(ages)
+    asset_classes = list(allocation_grid.keys())
+    if not asset_classes:
+        raise ValueError('Glide path is empty. Please configure it first.')
+    allocations = np.column_stack([allocation_grid[asset_class] for asset_class in asset_classes]) / 100
+    # Contributions before retirement, withdrawals after
+    contributions = np.where(ages < retirement_age, annual_contribution, -annual_withdrawal)
+
+    if method == 'bootstrap':
+        if annual_returns is None or annual_returns.empty:
+            raise ValueError('Not enough price history to bootstrap annual returns.')
+        missing = [asset_class for asset_class in asset_classes
+                   if asset_class not in annual_returns.columns and allocations[:, asset_classes.index(asset_class)].any()]
+        if missing:
+            raise ValueError(f"No price history to bootstrap {', '.join(missing)}")
+        returns_source = np.column_stack([
+            annual_returns[asset_class].to_numpy() if asset_class in annual_returns.columns else np.zeros(len(annual_returns))
+            for asset_class in asset_classes
+        ])
+    else:
+        assumptions = {**DEFAULT_RETURN_ASSUMPTIONS, **(assumptions or {})}
+        returns_source = (
+            np.array([assumptions.get(asset_class, (0.0, 0.0))[0] for asset_class in asset_classes]),
+            np.array([assumptions.get(asset_class, (0.0, 0.0))[1] for asset_class in asset_classes]),
+        )
+
+    # Fixed chunk sizes and spawned seeds keep results identical for any number of workers
+    chunk_sizes = [CHUNK_SIZE] * (paths // CHUNK_SIZE) + ([paths % CHUNK_SIZE] if paths % CHUNK_SIZE else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(chunk_seed, size, allocations, contributions, method, returns_source, initial_amount)
+             for chunk_seed, size in zip(seeds, chunk_sizes)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        executor = _get_executor(workers)
+        try:
+            chunks = list(executor.map(_simulate_chunk, tasks))
+        except BrokenProcessPool:
+            # A worker died; the next projection starts a fresh pool
+            _discard_executor(executor)
+            raise
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+    wealth = np.concatenate(chunks)
+
+    bands = np.percentile(wealth, PERCENTILES, axis=0)
+    return {
+        'ages': [int(age) for age in np.append(ages, END_AGE)],
+        'percentiles': {str(p): [round(float(value), 2) for value in band] for p, band in zip(PERCENTILES, bands)},
+        'depletion_probability': round(float(np.mean(wealth[:, -1] <= 0)) * 100, 2),
+        'paths': paths,
+        'method': method,
+    }
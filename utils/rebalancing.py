@@ -2,7 +2,11 @@
 
 from utils.config_manager import load_config
 from utils.allocation import get_allocations
+import csv
 import datetime
+import io
+import json
+import numpy as np
 
 def calculate_rebalancing(current_holdings, amount_to_invest, config=None):
     if config is None:
@@ -51,3 +55,185 @@ def calculate_rebalancing(current_holdings, amount_to_invest, config=None):
         for fund in desired_holdings:
             amounts_to_invest_per_fund[fund] = 0
     return amounts_to_invest_per_fund, amounts_needed, age
+
+def get_target_fund_weights(config, age):
+    # [(symbol, asset class fraction, fund fraction)] in the order calculate_rebalancing fills desired_holdings
+    desired_allocations = get_allocations(age, config)
+    targets = {}
+    for asset_class in desired_allocations:
+        for fund_info in config['funds'].get(asset_class, []):
+            targets[fund_info['symbol']] = (desired_allocations[asset_class] / 100, fund_info['percentage'] / 100)
+    return [(symbol, allocation, fund_percentage) for symbol, (allocation, fund_percentage) in targets.items()]
+
+def calculate_rebalancing_batch(holdings, symbols, amounts_to_invest, config):
+    # holdings: accounts x symbols matrix of current values, columns ordered like symbols
+    # amounts_to_invest: contribution amounts tried for every account
+    # Returns (amounts_to_invest_per_fund, amounts_needed) shaped accounts x amounts x target symbols,
+    # the target symbols and the age, matching calculate_rebalancing for each account/amount pair
+    holdings = np.atleast_2d(np.asarray(holdings, dtype=float))
+    amounts = np.atleast_1d(np.asarray(amounts_to_invest, dtype=float))
+    current_year = datetime.datetime.now().year
+    date_of_birth = config.get('date_of_birth', 0)
+    age = current_year - date_of_birth
+    targets = get_target_fund_weights(config, age)
+    target_symbols = [symbol for symbol, _, _ in targets]
+    allocation_fractions = np.array([allocation for _, allocation, _ in targets], dtype=float)
+    fund_fractions = np.array([fund_percentage for _, _, fund_percentage in targets], dtype=float)
+    # Current value of each target symbol, 0 when an account does not hold it
+    column_of = {symbol: col for col, symbol in enumerate(symbols)}
+    current = np.zeros((holdings.shape[0], len(target_symbols)))
+    for target_col, symbol in enumerate(target_symbols):
+        if symbol in column_of:
+            current[:, target_col] = holdings[:, column_of[symbol]]
+    # Sequential sums (cumsum) keep the float results identical to the dict-based loop
+    holdings_total = np.cumsum(holdings, axis=1)[:, -1] if holdings.shape[1] else np.zeros(holdings.shape[0])
+    total_value = holdings_total[:, None] + amounts[None, :]
+    desired = (total_value[:, :, None] * allocation_fractions) * fund_fractions
+    amounts_needed = np.maximum(desired - current[:, None, :], 0)
+    total_needed = np.cumsum(amounts_needed, axis=2)[:, :, -1:] if target_symbols else np.zeros(amounts_needed.shape[:2] + (1,))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        invest = amounts[None, :, None] * (amounts_needed / total_needed)
+    invest = np.where(total_needed > 0, invest, 0.0)
+    return invest, amounts_needed, target_symbols, age
+
+def parse_bulk_holdings(filename, content):
+    # CSV: header 'account,<symbol>,...' with one row per account
+    # JSON: {"<account>": {"<symbol>": value, ...}, ...}
+    text = content.decode('utf-8-sig') if isinstance(content, bytes) else content
+    if filename.lower().endswith('.json'):
+        accounts_data = json.loads(text)
+        if not isinstance(accounts_data, dict):
+            raise ValueError('JSON holdings must map each account name to its holdings.')
+        accounts = list(accounts_data.keys())
+        symbols = list(dict.fromkeys(symbol for account in accounts for symbol in accounts_data[account]))
+        holdings = np.array([[float(accounts_data[account].get(symbol, 0) or 0) for symbol in symbols]
+                             for account in accounts], dtype=float).reshape(len(accounts), len(symbols))
+        return accounts, symbols, holdings
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows or len(rows[0]) < 2:
+        raise ValueError("CSV holdings need a header row of 'account' followed by fund symbols.")
+    symbols = [symbol.strip() for symbol in rows[0][1:]]
+    accounts = []
+    values = []
+    for row in rows[1:]:
+        if not row or not row[0].strip():
+            continue
+        accounts.append(row[0].strip())
+        values.append([float(value) if value.strip() else 0.0 for value in row[1:len(symbols) + 1]]
+                      + [0.0] * (len(symbols) - len(row[1:])))
+    return accounts, symbols, np.array(values, dtype=float).reshape(len(accounts), len(symbols))
+
+def _tracking_error(values, weights, total_value):
+    return float(np.sqrt(np.sum((values / total_value - weights) ** 2)) * 100)
+
+def calculate_share_rebalancing(current_holdings, amount_to_invest, prices, config, allow_sells=True,
+                                max_trades=None, tolerance=None):
+    # Whole-share buy/sell orders that approximately minimise the squared distance between the
+    # resulting weights and the glide path target; the greedy whole-share repair can miss the
+    # best integer solution. current_holdings are dollar values, prices per share.
+    # tolerance (percentage points) leaves funds already within the band untouched,
+    # max_trades keeps only the largest orders.
+    if max_trades is not None and max_trades < 0:
+        raise ValueError('The maximum number of trades cannot be negative.')
+    if tolerance is not None and not 0 <= tolerance < float('inf'):
+        raise ValueError('The tolerance must be a non-negative number of percentage points.')
+    current_year = datetime.datetime.now().year
+    date_of_birth = config.get('date_of_birth', 0)
+    age = current_year - date_of_birth
+    targets = {symbol: allocation * fund_percentage
+               for symbol, allocation, fund_percentage in get_target_fund_weights(config, age)}
+    symbols = list(dict.fromkeys(list(targets) + [symbol for symbol, value in current_holdings.items() if value]))
+    missing_prices = [symbol for symbol in symbols if not prices.get(symbol)]
+    if missing_prices:
+        raise ValueError(f"No current price available for {', '.join(missing_prices)}")
+    price = np.array([float(prices[symbol]) for symbol in symbols])
+    weight = np.array([targets.get(symbol, 0.0) for symbol in symbols])
+    current = np.array([float(current_holdings.get(symbol, 0.0)) for symbol in symbols])
+    total_value = current.sum() + amount_to_invest
+    if total_value <= 0:
+        raise ValueError('The portfolio and amount to invest must be greater than zero.')
+    held_shares = current / price
+
+    # Bounds on the final value of every fund
+    lower = np.zeros(len(symbols)) if allow_sells else current.copy()
+    upper = np.full(len(symbols), np.inf)
+    if tolerance is not None:
+        within_band = np.abs(current / total_value - weight) * 100 <= tolerance
+        lower[within_band] = current[within_band]
+        upper[within_band] = current[within_band]
+
+    def solve(lower, upper):
+        # Continuous optimum: fill every fund towards weight * total, lowered by a common
+        # shortfall mu until the purchases fit the cash available (water-filling)
+        def spend(mu):
+            return np.sum(np.clip((weight - mu) * total_value, lower, upper) - current)
+        mu_low, mu_high = 0.0, 1.0
+        if spend(mu_low) > amount_to_invest:
+            for _ in range(60):
+                mu = (mu_low + mu_high) / 2
+                if spend(mu) > amount_to_invest:
+                    mu_low = mu
+                else:
+                    mu_high = mu
+            mu_low = mu_high
+        ideal = np.clip((weight - mu_low) * total_value, lower, upper)
+        # Round towards whole shares, never selling more whole shares than are held
+        delta = np.floor((ideal - current) / price + 1e-9)
+        delta = np.maximum(delta, -np.floor(held_shares + 1e-9))
+        if not allow_sells:
+            delta = np.maximum(delta, 0)
+        tradable = upper > lower
+        delta[~tradable] = 0
+
+        def objective_change(sign):
+            deviation = (current + delta * price) / total_value - weight
+            step = sign * price / total_value
+            return (deviation + step) ** 2 - deviation ** 2
+
+        # Drop buys that overdraw the cash, then add single shares while they reduce the error
+        cash = amount_to_invest - float(np.sum(delta * price))
+        while cash < -1e-9:
+            candidates = np.where(delta > 0)[0]
+            if len(candidates) == 0:
+                break
+            cheapest_loss = candidates[np.argmin(objective_change(-1)[candidates])]
+            delta[cheapest_loss] -= 1
+            cash += price[cheapest_loss]
+        while True:
+            change = objective_change(1)
+            change[~tradable | (price > cash + 1e-9)] = np.inf
+            best = int(np.argmin(change))
+            if not np.isfinite(change[best]) or change[best] >= 0:
+                break
+            delta[best] += 1
+            cash -= price[best]
+        return delta, cash
+
+    delta, cash_remaining = solve(lower, upper)
+    if max_trades is not None and np.count_nonzero(delta) > max_trades:
+        # Keep the largest orders and solve again with every other fund held where it is
+        frozen = np.ones(len(symbols), dtype=bool)
+        frozen[np.argsort(-np.abs(delta * price), kind='stable')[:max_trades]] = False
+        frozen |= delta == 0
+        lower[frozen] = current[frozen]
+        upper[frozen] = current[frozen]
+        delta, cash_remaining = solve(lower, upper)
+
+    final_values = current + delta * price
+    orders = {}
+    for i, symbol in enumerate(symbols):
+        orders[symbol] = {
+            'shares': int(delta[i]),
+            'price': float(price[i]),
+            'trade_value': float(delta[i] * price[i]),
+            'target_weight': float(weight[i] * 100),
+            'current_weight': float(current[i] / total_value * 100),
+            'final_weight': float(final_values[i] / total_value * 100)
+        }
+    summary = {
+        'cash_remaining': float(cash_remaining),
+        'tracking_error_before': _tracking_error(current, weight, total_value),
+        'tracking_error_after': _tracking_error(final_values, weight, total_value),
+        'trade_count': int(np.count_nonzero(delta))
+    }
+    return orders, summary, age
@@ -0,0 +1,115 @@
+# utils/refresher.py
+
+import datetime
+import hashlib
+import json
+import threading
+from utils.config_manager import load_config, get_available_funds
+from utils.metrics import cache_result, timer
+
+REFRESH_INTERVAL = 15 * 60  # seconds between background refreshes
+
+# fund_id -> latest precomputed performance snapshot
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+_refresh_requested = threading.Event()
+_refresh_running = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+
+def config_signature(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _fund_symbols(config):
+    fund_symbols = []
+    for funds in config['funds'].values():
+        for fund_info in funds:
+            fund_symbols.append(fund_info['symbol'])
+    return fund_symbols
+
+def build_snapshot(config, histories=None):
+    # pandas and the fetch layer are imported here so starting the worker stays cheap
+    from utils.fetcher import fetch_histories
+    from utils.performance import get_fund_allocations, get_fund_performance
+    from utils.performance_cache import get_performance_cache
+    fund_symbols = _fund_symbols(config)
+    if histories is None:
+        with timer('fetch'):
+            histories = fetch_histories(fund_symbols)
+    performance_data, _ = get_fund_performance(fund_symbols, config, include_history=False, histories=histories)
+    with timer('merge'):
+        # A config edit only reweights the cached price matrix, and new bars extend it
+        loaded = {symbol: histories[symbol] for symbol in fund_symbols if not isinstance(histories[symbol], Exception)}
+        fund_allocations = get_fund_allocations(config)
+        weights = {symbol: fund_allocations.get(symbol, 0) / 100 for symbol in loaded}
+        overall_history = get_performance_cache().weighted_series(loaded, weights)
+    return {
+        'performance_data': performance_data,
+        'overall_history': overall_history,
+        'config_signature': config_signature(config),
+        'as_of': datetime.datetime.now(),
+    }
+
+def store_snapshot(fund_id, snapshot):
+    with _snapshots_lock:
+        _snapshots[fund_id] = snapshot
+
+def get_snapshot(fund_id, config):
+    # Latest snapshot for the fund, or None if there is none for this version of its config
+    snapshot = _snapshots.get(fund_id)
+    if snapshot is None or snapshot['config_signature'] != config_signature(config):
+        cache_result('snapshot', False)
+        return None
+    cache_result('snapshot', True)
+    return snapshot
+
+def refresh_all(max_age=REFRESH_INTERVAL):
+    # Fetch the union of symbols across all funds once, then rebuild every fund's snapshot
+    from utils.fetcher import fetch_histories
+    from utils.price_store import get_price_history
+    if not _refresh_running.acquire(blocking=False):
+        return False
+    try:
+        configs = {}
+        for fund in get_available_funds():
+            try:
+                configs[fund['id']] = load_config(fund['id'])
+            except Exception:
+                continue
+        symbols = list(dict.fromkeys(symbol for config in configs.values() for symbol in _fund_symbols(config)))
+        histories = fetch_histories(symbols, fetch=lambda symbol: get_price_history(symbol, max_age=max_age))
+        for fund_id, config in configs.items():
+            try:
+                store_snapshot(fund_id, build_snapshot(config, histories))
+            except Exception:
+                continue
+        return True
+    finally:
+        _refresh_running.release()
+
+def _run_worker(interval):
+    while True:
+        # A manual request forces every stored symbol to be checked upstream
+        forced = _refresh_requested.is_set()
+        _refresh_requested.clear()
+        try:
+            refresh_all(max_age=0 if forced else interval)
+        except Exception:
+            pass
+        _refresh_requested.wait(timeout=interval)
+
+def start_refresh_worker(interval=REFRESH_INTERVAL):
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return _worker
+        _worker = threading.Thread(target=_run_worker, args=(interval,), name='price-refresher', daemon=True)
+        _worker.start()
+        return _worker
+
+def request_refresh():
+    # Wake the worker for an immediate refresh, or run one in the background if no worker is running
+    if _worker is not None and _worker.is_alive():
+        _refresh_requested.set()
+    else:
+        threading.Thread(target=refresh_all, kwargs={'max_age': 0}, name='price-refresh', daemon=True).start()